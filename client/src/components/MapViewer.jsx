@@ -20,7 +20,8 @@ const MapViewer = ({ taskId, project, detections }) => {
 	// Use local backend proxy to fetch tiles authenticated
 
 	const WEBODM_ADDR = __USE_DEV_ADDR__ ? "localhost" : import.meta.env.VITE_SERVER_ADDR;
-	const baseUrl = `http://${WEBODM_ADDR}:${import.meta.env.VITE_PORT}/api`;
+	const serverUrl = `http://${WEBODM_ADDR}:${import.meta.env.VITE_PORT}`;
+	const baseUrl = `${serverUrl}/api`;
 	const tileUrl = `${baseUrl}/projects/${taskId}/tiles/{z}/{x}/{y}.png`;
 
 	return (
@@ -32,6 +33,7 @@ const MapViewer = ({ taskId, project, detections }) => {
 				<MapContent
 					project={project}
 					detections={detections}
+					serverUrl={serverUrl}
 					// orthoPhotoUrl={orthoPhotoUrl}
 					tileUrl={tileUrl}
 				/>
@@ -40,7 +42,7 @@ const MapViewer = ({ taskId, project, detections }) => {
 	);
 };
 
-const MapContent = ({ project, detections, tileUrl, orthoPhotoUrl }) => {
+const MapContent = ({ project, detections, serverUrl, tileUrl, orthoPhotoUrl }) => {
 	const map = useMap();
 	const [bounds, setBounds] = React.useState(null);
 	const [mousePos, setMousePos] = React.useState(null);
@@ -145,9 +147,9 @@ const MapContent = ({ project, detections, tileUrl, orthoPhotoUrl }) => {
 										<span class="font-bold uppercase tracking-wider text-xs">${p.label || "Object"}</span>
 										<span class="text-xs bg-green-500/20 text-green-300 px-2 py-0.5 rounded">${p.confidence ? (p.confidence * 100).toFixed(1) + "%" : "N/A"}</span>
 									</div>
-									${p.image
+									${p.image || p.image_url
 									? `<div class="mb-2 rounded overflow-hidden border border-gray-200">
-												<img src="data:image/jpeg;base64,${p.image}" class="w-full h-auto object-cover" alt="${p.label}" />
+												<img src="${p.image_url ? serverUrl + p.image_url : "data:image/jpeg;base64," + p.image}" class="w-full h-auto object-cover" alt="${p.label}" />
 											   </div>`
 									: ""
 								}
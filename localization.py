@@ -1,7 +1,12 @@
 import math
+import numpy as np
 from pyproj import Transformer
 
-def pixel_to_geo(
+# CRS setup is by far the slowest part of a projection: build the transformers once
+_TO_MERCATOR = Transformer.from_crs("epsg:4326", "epsg:3857", always_xy=True)
+_FROM_MERCATOR = Transformer.from_crs("epsg:3857", "epsg:4326", always_xy=True)
+
+def pixel_to_geo_batch(
     lat, lon, alt,
     px, py,
     img_w, img_h,
@@ -10,8 +15,11 @@ def pixel_to_geo(
     yaw_deg
 ):
     """
-    Converts pixel location to GPS coordinate using camera model
+    Vectorized pixel_to_geo: px, py are arrays of pixel coordinates from one image
+    (camera params shared). Returns (lats, lons) arrays.
     """
+    px = np.asarray(px, dtype=np.float64)
+    py = np.asarray(py, dtype=np.float64)
 
     # Camera parameters
     fx = (focal_mm / sensor_w_mm) * img_w
@@ -31,13 +39,21 @@ def pixel_to_geo(
     n = east * math.sin(yaw) + north * math.cos(yaw)
 
     # Convert to lat/lon
-    t = Transformer.from_crs("epsg:4326", "epsg:3857", always_xy=True)
-    x0, y0 = t.transform(lon, lat)
-
-    x0 += e
-    y0 += n
+    x0, y0 = _TO_MERCATOR.transform(lon, lat)
+    lon2, lat2 = _FROM_MERCATOR.transform(x0 + e, y0 + n)
 
-    t_back = Transformer.from_crs("epsg:3857", "epsg:4326", always_xy=True)
-    lon2, lat2 = t_back.transform(x0, y0)
+    return np.asarray(lat2), np.asarray(lon2)
 
-    return lat2, lon2
\ No newline at end of file
+def pixel_to_geo(
+    lat, lon, alt,
+    px, py,
+    img_w, img_h,
+    focal_mm,
+    sensor_w_mm,
+    yaw_deg
+):
+    """
+    Converts pixel location to GPS coordinate using camera model
+    """
+    lats, lons = pixel_to_geo_batch(lat, lon, alt, [px], [py], img_w, img_h, focal_mm, sensor_w_mm, yaw_deg)
+    return float(lats[0]), float(lons[0])
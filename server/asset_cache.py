@@ -0,0 +1,142 @@
+import os
+import re
+import sys
+import time
+import hashlib
+import requests
+
+# Local cache of WebODM task assets (orthophotos), so reruns on the same task skip the download.
+CACHE_DIR = os.getenv('ASSET_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'assets'))
+CACHE_MAX_BYTES = int(float(os.getenv('ASSET_CACHE_MAX_GB', '20')) * 1024 ** 3)
+CHUNK_SIZE = int(os.getenv('DOWNLOAD_CHUNK_SIZE', str(4 * 1024 * 1024)))
+# Interrupted downloads (.part) not written to for this long are dropped by evict
+PART_MAX_AGE_S = 24 * 3600
+
+def _validator(url, headers):
+    """
+    ETag or Last-Modified of the remote asset, None when the server gives neither
+    (the asset is then not cached). Content-Length can't tell two versions apart and
+    isn't a valid If-Range value.
+    """
+    try:
+        res = requests.head(url, headers=headers, allow_redirects=True, timeout=30)
+        if res.status_code == 200:
+            return res.headers.get('ETag') or res.headers.get('Last-Modified')
+    except Exception as e:
+        print(f"[CACHE] HEAD failed for {url}: {e}", file=sys.stderr)
+    return None
+
+def cache_path(key, validator, cache_dir=CACHE_DIR, ext='.tif'):
+    # Content-addressed: same asset version -> same file, a new version gets a new name
+    safe_key = re.sub(r'[^A-Za-z0-9_.-]', '_', str(key))
+    digest = hashlib.sha1(f"{key}|{validator}".encode('utf-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{safe_key}-{digest}{ext}")
+
+def download(url, path, headers, chunk_size=CHUNK_SIZE, validator=None, metrics=None):
+    """
+    Downloads url to path, resuming from path + '.part' with an HTTP Range request
+    when an earlier transfer was interrupted. If-Range makes the server send the
+    whole file again if the asset changed in between. A .part that is already
+    complete (416 for the range) is kept, one of another size is dropped.
+    metrics (metrics.Metrics) receives the transfer time and byte count.
+    """
+    part = path + '.part'
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+
+    req_headers = dict(headers)
+    if offset:
+        req_headers['Range'] = f"bytes={offset}-"
+        if validator:
+            req_headers['If-Range'] = validator
+
+    started = time.perf_counter()
+    received = 0
+    with requests.get(url, headers=req_headers, stream=True) as r:
+        if offset and r.status_code == 416:
+            # Nothing left past offset: the transfer finished but wasn't renamed, unless the
+            # size doesn't match the asset (Content-Range: bytes */size), then start over
+            if r.headers.get('Content-Range', '').rpartition('/')[2] != str(offset):
+                print(f"[CACHE] Discarding partial download of {offset} bytes", file=sys.stderr)
+                os.remove(part)
+                return download(url, path, headers, chunk_size, validator, metrics)
+            print(f"[CACHE] Partial download already complete ({offset} bytes)", file=sys.stderr)
+        else:
+            r.raise_for_status()
+            if offset and r.status_code == 206:
+                print(f"[CACHE] Resuming download at {offset} bytes", file=sys.stderr)
+                mode = 'ab'
+            else:
+                mode = 'wb'
+            with open(part, mode) as f:
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    received += len(chunk)
+
+    if metrics is not None:
+        metrics.observe('download', time.perf_counter() - started)
+        metrics.count('download_bytes', received)
+
+    os.replace(part, path)
+    return path
+
+def evict(cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, keep=()):
+    """
+    Removes least recently used assets until the cache fits in max_bytes.
+    Use is tracked in the access time, mtime stays the download time (tile_cache
+    reuses file hashes while size and mtime are unchanged).
+    Downloads in progress (.part files, maybe another process's) are left alone,
+    unless nothing was written to them for PART_MAX_AGE_S.
+    """
+    if not os.path.isdir(cache_dir):
+        return
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if not os.path.isfile(path):
+            continue
+        st = os.stat(path)
+        if name.endswith('.part'):
+            if time.time() - st.st_mtime > PART_MAX_AGE_S:
+                print(f"[CACHE] Removing stale partial download {path}", file=sys.stderr)
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass # finished or dropped in the meantime
+            continue
+        entries.append((st.st_atime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        print(f"[CACHE] Evicting {path}", file=sys.stderr)
+        os.remove(path)
+        total -= size
+
+def fetch_asset(url, headers, key, ext='.tif', cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, chunk_size=CHUNK_SIZE, metrics=None):
+    """
+    Returns a local path for the asset at url, downloading it only if this version
+    (ETag / Last-Modified) is not cached yet. key identifies the asset, e.g. project/task id.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    validator = _validator(url, headers)
+    path = cache_path(key, validator, cache_dir, ext)
+
+    if validator and os.path.exists(path):
+        print(f"[CACHE] Hit {path}", file=sys.stderr)
+        os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns)) # mark as recently used, keeping mtime
+        if metrics is not None:
+            metrics.count('asset_cache_hits')
+        return path
+
+    if not validator:
+        # Can't tell versions apart: never resume or reuse a stale file
+        for stale in (path, path + '.part'):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    download(url, path, headers, chunk_size, validator, metrics)
+    evict(cache_dir, max_bytes, keep=(path,))
+    return path
@@ -0,0 +1,251 @@
+import sys
+import numpy as np
+
+# Deduplication of detections, shared by the orthophoto (detect_task) and raw frame
+# (detect_raw) paths. Policies:
+#   hybrid      - greedy by confidence: drop boxes inside a kept box or overlapping it (IoU > thresh)
+#   nms         - greedy by confidence, IoU only
+#   containment - drop every box that lies inside another box (order independent,
+#                 of identical boxes the highest confidence one is kept)
+# By default only boxes of the same class affect each other (class_agnostic=False).
+POLICIES = ('hybrid', 'nms', 'containment')
+
+# Upper bound on pairwise matrix elements computed at once by the filters (~8 bytes each, a few arrays)
+FILTER_BLOCK_ELEMENTS = 2_000_000
+
+def _greedy_suppress(boxes, iou_thresh, containment=True, debug_ids=None):
+    """
+    Greedy containment + NMS over boxes (N, 4) already sorted by confidence (desc).
+    Same decisions as the pairwise loop it replaced: for each kept box i, in order,
+    later boxes inside i or overlapping it (IoU > thresh) are dropped, until the first
+    later box that contains i, which drops i itself.
+    containment=False is plain NMS (only the IoU test).
+    Pairwise matrices are computed a block of rows at a time to bound memory.
+    debug_ids (ids to report per box) enables logging of every suppression.
+    Returns the keep mask.
+    """
+    n = len(boxes)
+    keep = np.ones(n, dtype=bool)
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+
+    rows_per_block = max(1, FILTER_BLOCK_ELEMENTS // max(1, n))
+    for start in range(0, n, rows_per_block):
+        stop = min(start + rows_per_block, n)
+        if not keep[start:stop].any():
+            continue
+
+        # Block rows [start, stop) against every later box [start, n)
+        ax1, ay1, ax2, ay2 = (v[start:stop, None] for v in (x1, y1, x2, y2))
+        bx1, by1, bx2, by2 = (v[None, start:] for v in (x1, y1, x2, y2))
+
+        inter = np.maximum(0, np.minimum(ax2, bx2) - np.maximum(ax1, bx1)) * \
+                np.maximum(0, np.minimum(ay2, by2) - np.maximum(ay1, by1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            iou = np.where(inter > 0, inter / ((areas[start:stop, None] + areas[None, start:]) - inter), 0)
+        overlaps = iou > iou_thresh
+
+        if containment:
+            b_in_a = (bx1 >= ax1) & (by1 >= ay1) & (bx2 <= ax2) & (by2 <= ay2)
+            a_in_b = (ax1 >= bx1) & (ay1 >= by1) & (ax2 <= bx2) & (ay2 <= by2)
+        else:
+            b_in_a = a_in_b = np.zeros_like(overlaps)
+
+        later = keep[start:] # view, updated in place
+        cols = np.arange(start, n)
+
+        # Fast path: most boxes touch nothing after them, only walk rows that do
+        interacts = (b_in_a | a_in_b | overlaps) & (cols[None, :] > np.arange(start, stop)[:, None])
+        for i in start + np.flatnonzero(interacts.any(axis=1)):
+            if not keep[i]:
+                continue
+            r = i - start
+            valid = later & (cols > i)
+
+            # First later box that contains i (and isn't contained by it) ends i's pass
+            contains_i = np.flatnonzero(a_in_b[r] & ~b_in_a[r] & valid)
+            suppress = (b_in_a[r] | overlaps[r]) & valid
+            if len(contains_i):
+                suppress[contains_i[0]:] = False
+
+            if debug_ids is not None:
+                a = debug_ids[i]
+                for j in np.flatnonzero(suppress):
+                    b = debug_ids[cols[j]]
+                    if b_in_a[r, j]:
+                        print(f"[DEBUG] Box {b} inside {a}. Removing {b} (Containment)", file=sys.stderr)
+                    else:
+                        print(f"[DEBUG] Box {b} overlaps {a} (IoU={iou[r, j]:.2f}). Removing {b} (NMS)", file=sys.stderr)
+                if len(contains_i):
+                    b = debug_ids[cols[contains_i[0]]]
+                    print(f"[DEBUG] Box {a} inside {b}. Removing {a} (Containment)", file=sys.stderr)
+
+            later[suppress] = False
+            if len(contains_i):
+                keep[i] = False
+
+    return keep
+
+def _contained(boxes):
+    """
+    Containment policy over boxes (N, 4) sorted by confidence (desc): a box is dropped
+    if it lies inside any other box, whether that one is kept or not.
+    Of identical boxes the first (highest confidence) one is kept.
+    Returns the keep mask.
+    """
+    n = len(boxes)
+    keep = np.ones(n, dtype=bool)
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    idx = np.arange(n)
+
+    rows_per_block = max(1, FILTER_BLOCK_ELEMENTS // max(1, n))
+    for start in range(0, n, rows_per_block):
+        stop = min(start + rows_per_block, n)
+        ax1, ay1, ax2, ay2 = (v[start:stop, None] for v in (x1, y1, x2, y2))
+        bx1, by1, bx2, by2 = (v[None, :] for v in (x1, y1, x2, y2))
+
+        a_in_b = (ax1 >= bx1) & (ay1 >= by1) & (ax2 <= bx2) & (ay2 <= by2)
+        same = (ax1 == bx1) & (ay1 == by1) & (ax2 == bx2) & (ay2 == by2)
+        # Strictly inside another box, or a duplicate of an earlier one
+        inside = a_in_b & (~same | (idx[None, :] < idx[start:stop, None]))
+        keep[start:stop] = ~inside.any(axis=1)
+
+    return keep
+
+def touching_pairs(boxes, classes):
+    """
+    Spatial index for deduplication. Boxes (N, 4) are bucketed into a uniform grid
+    keyed on (class, cell) and only boxes sharing a bucket are tested against each
+    other, so the cost grows with local density instead of N^2.
+    Returns index arrays (a, b) of the pairs of same-class boxes that touch
+    (a pair may appear more than once).
+    """
+    n = len(boxes)
+    if n < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # Cell ~2x the typical box so most boxes land in 1-4 cells
+    sizes = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1])
+    cell = max(float(np.median(sizes)) * 2, 1.0)
+    ix0 = np.floor(boxes[:, 0] / cell).astype(np.int64)
+    iy0 = np.floor(boxes[:, 1] / cell).astype(np.int64)
+    nx = np.floor(boxes[:, 2] / cell).astype(np.int64) - ix0 + 1
+    ny = np.floor(boxes[:, 3] / cell).astype(np.int64) - iy0 + 1
+
+    # One entry per (box, covered cell)
+    counts = nx * ny
+    box_e = np.repeat(np.arange(n), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    cx_e = ix0[box_e] + local % nx[box_e]
+    cy_e = iy0[box_e] + local // nx[box_e]
+    cls_e = classes[box_e]
+
+    order = np.lexsort((box_e, cy_e, cx_e, cls_e))
+    box_e, cx_e, cy_e, cls_e = box_e[order], cx_e[order], cy_e[order], cls_e[order]
+
+    # Entries of a bucket are contiguous: pair every entry with the ones d places after it
+    pairs_a, pairs_b = [], []
+    d = 1
+    while d < len(box_e):
+        same = (cls_e[:-d] == cls_e[d:]) & (cx_e[:-d] == cx_e[d:]) & (cy_e[:-d] == cy_e[d:])
+        if not same.any():
+            break
+        a, b = box_e[:-d][same], box_e[d:][same]
+        touch = (boxes[a, 0] <= boxes[b, 2]) & (boxes[b, 0] <= boxes[a, 2]) & \
+                (boxes[a, 1] <= boxes[b, 3]) & (boxes[b, 1] <= boxes[a, 3])
+        pairs_a.append(a[touch])
+        pairs_b.append(b[touch])
+        d += 1
+
+    if not pairs_a:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(pairs_a), np.concatenate(pairs_b)
+
+def connected_components(n, a, b):
+    """
+    Component label per node for the undirected edges (a, b): the smallest node
+    index of each component. Min-label propagation with pointer jumping.
+    """
+    labels = np.arange(n)
+    if not len(a):
+        return labels
+    while True:
+        m = np.minimum(labels[a], labels[b])
+        new = labels.copy()
+        np.minimum.at(new, a, m)
+        np.minimum.at(new, b, m)
+        new = new[new]
+        if np.array_equal(new, labels):
+            return labels
+        labels = new
+
+def interaction_groups(boxes, classes):
+    """
+    Returns a label per box: boxes of the same class that touch (directly or through
+    a chain of touching boxes) share a label. See touching_pairs.
+    """
+    a, b = touching_pairs(boxes, classes)
+    return connected_components(len(boxes), a, b)
+
+def dedup_boxes(boxes, scores, classes=None, policy='hybrid', iou_thresh=0.5, class_agnostic=False, debug=False):
+    """
+    Deduplicates boxes (N, 4: x1, y1, x2, y2) with scores (N,) and classes (N,) using
+    policy (see POLICIES). Only touching boxes can affect each other, so each group from
+    interaction_groups is filtered on its own.
+    debug=True logs every suppression of the greedy policies to stderr, boxes are
+    numbered by confidence rank.
+    Returns the keep mask in input order.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown dedup policy: {policy} (expected one of {', '.join(POLICIES)})")
+
+    n = len(boxes)
+    keep = np.ones(n, dtype=bool)
+    if n < 2:
+        return keep
+
+    # Sort by confidence descending (crucial for NMS), stable for equal scores
+    order = np.argsort(-np.asarray(scores, dtype=np.float64), kind='stable')
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(n, 4)[order]
+    if class_agnostic or classes is None:
+        classes = np.zeros(n, dtype=np.int64)
+    else:
+        classes = np.asarray(classes)[order]
+
+    labels = interaction_groups(boxes, classes)
+
+    # Isolated boxes are always kept; walk the groups with 2+ members
+    grouped = np.flatnonzero(np.bincount(labels, minlength=n)[labels] > 1)
+    grouped = grouped[np.argsort(labels[grouped], kind='stable')] # contiguous groups, still in confidence order
+    bounds = np.flatnonzero(np.diff(labels[grouped])) + 1
+    sorted_keep = np.ones(n, dtype=bool)
+    for group in np.split(grouped, bounds):
+        if not len(group):
+            continue
+        if policy == 'containment':
+            sorted_keep[group] = _contained(boxes[group])
+        else:
+            sorted_keep[group] = _greedy_suppress(boxes[group], iou_thresh, containment=(policy == 'hybrid'),
+                                                  debug_ids=group if debug else None)
+
+    keep[order] = sorted_keep
+    return keep
+
+def filter_candidates(candidates, policy='hybrid', iou_thresh=0.5, class_agnostic=False, debug=False):
+    """
+    dedup_boxes over candidate dicts ('bbox', 'conf', 'cls').
+    Returns the surviving candidates, highest confidence first.
+    """
+    if not candidates:
+        return []
+
+    # Sort by confidence descending
+    candidates = sorted(candidates, key=lambda x: x['conf'], reverse=True)
+
+    n = len(candidates)
+    boxes = np.array([c['bbox'] for c in candidates], dtype=np.float64).reshape(n, 4)
+    scores = np.array([c['conf'] for c in candidates], dtype=np.float64)
+    classes = np.array([c['cls'] for c in candidates])
+    keep = dedup_boxes(boxes, scores, classes, policy, iou_thresh, class_agnostic, debug)
+
+    return [candidates[i] for i in range(n) if keep[i]]
@@ -3,210 +3,461 @@ import sys
 import argparse
 import json
 import cv2
-import exifread
 import math
 import numpy as np
-from ultralytics import YOLO
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 # Import user provided function from parent dir or same dir
 # server/detect_raw.py -> ../localization.py? 
 # The user said they added localization.py to CustomApp root?
 # Let's fix import path.
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
-    from localization import pixel_to_geo
+    from localization import pixel_to_geo_batch
 except ImportError:
     # Fallback if in same dir
-    from localization import pixel_to_geo
+    from localization import pixel_to_geo_batch
+from model_cache import get_model
+from image_meta import get_image_meta
+from dedup import POLICIES, dedup_boxes, touching_pairs
+from tiling import tile_windows, iter_tile_batches
+from metrics import Metrics, profiled
 
 DEFAULT_SENSOR_W = 6.17  # 1/2.3"
 DEFAULT_FOCAL = 24.0     # 24mm equiv? Needs checking.
 
+# Cross-image merge: detections of one class closer than max(MERGE_MIN_RADIUS_M,
+# merge_scale * object size on the ground) are taken as the same object.
+# The floor absorbs GPS / heading error between frames.
+MERGE_MIN_RADIUS_M = 2.0
+METERS_PER_DEG = 111320.0
+
 def get_exif_data(image_path):
-    with open(image_path, 'rb') as f:
-        tags = exifread.process_file(f)
-        
+    """
+    Camera pose of a frame for localization (shared, cached EXIF parse + our defaults).
+    """
+    meta = get_image_meta(image_path)
     data = {}
-    
-    def get_float(tag):
-        if tag in tags:
-            val = tags[tag].values
-            if isinstance(val, list):
-                val = val[0]
-            if isinstance(val, int):
-                return float(val)
-            if hasattr(val, 'num') and hasattr(val, 'den') and val.den != 0:
-                return float(val.num) / float(val.den)
-        return None
-        
-    def convert_dms(dms_ratios):
-        d = float(dms_ratios[0].num) / float(dms_ratios[0].den)
-        m = float(dms_ratios[1].num) / float(dms_ratios[1].den)
-        s = float(dms_ratios[2].num) / float(dms_ratios[2].den)
-        return d + (m / 60.0) + (s / 3600.0)
 
     # Coordinates
-    if 'GPS GPSLatitude' in tags:
-        lat = convert_dms(tags['GPS GPSLatitude'].values)
-        if 'GPS GPSLatitudeRef' in tags and tags['GPS GPSLatitudeRef'].values == 'S': 
-            lat = -lat
-        data['lat'] = lat
-        
-    if 'GPS GPSLongitude' in tags:
-        lon = convert_dms(tags['GPS GPSLongitude'].values)
-        if 'GPS GPSLongitudeRef' in tags and tags['GPS GPSLongitudeRef'].values == 'W': 
-            lon = -lon
-        data['lon'] = lon
-        
+    if meta['lat'] is not None:
+        data['lat'] = meta['lat']
+    if meta['lon'] is not None:
+        data['lon'] = meta['lon']
+
     # Altitude
-    alt = get_float('GPS GPSAltitude')
-    if alt is not None:
-        data['alt'] = alt
-    else:
-        data['alt'] = 50.0 # Default relative height
+    data['alt'] = meta['alt'] if meta['alt'] is not None else 50.0 # Default relative height
 
     # Yaw / Heading
-    # Try different tags
-    yaw = get_float('GPS GPSImgDirection')
-    if yaw is None:
-        yaw = 0.0
-    data['yaw'] = yaw
-    
+    data['yaw'] = meta['yaw'] if meta['yaw'] is not None else 0.0
+
     # Focal Length
-    focal = get_float('EXIF FocalLength')
-    if focal is None:
-        focal = DEFAULT_FOCAL
-    data['focal'] = focal
-    
+    data['focal'] = meta['focal'] if meta['focal'] is not None else DEFAULT_FOCAL
+
     return data
 
-def run_detection_raw(image_paths, model_path):
-    # Load model
+def load_frame(img_path):
+    """
+    Metadata + decoded image of one frame, or None if it can't be used
+    (missing, no GPS, unreadable). Runs in the loader pool.
+    """
+    if not os.path.exists(img_path):
+        return None
+
     try:
-        model = YOLO(model_path)
+        # 1. Get Metadata
+        meta = get_exif_data(img_path)
+        if 'lat' not in meta or 'lon' not in meta:
+            return None # Cannot localize without GPS
+
+        # 2. Read Image
+        img = cv2.imread(img_path)
+        if img is None:
+            return None
+        return meta, img
     except Exception as e:
-        print(f"Error loading model {model_path}: {e}", file=sys.stderr)
-        return {"type": "FeatureCollection", "features": []}
+        print(f"Error processing {img_path}: {e}", file=sys.stderr)
+        return None
+
+def iter_frames(image_paths, workers=4, read_queue=8, load=load_frame):
+    """
+    Loads frames in a thread pool (EXIF parsing and JPEG decoding overlap with inference),
+    yielding (img_path, load(img_path)) in input order. At most read_queue frames are in flight.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='frame-loader') as pool:
+        in_flight = deque()
+        for img_path in image_paths:
+            in_flight.append((img_path, pool.submit(load, img_path)))
+            if len(in_flight) >= max(1, read_queue):
+                path, future = in_flight.popleft()
+                yield path, future.result()
+        while in_flight:
+            path, future = in_flight.popleft()
+            yield path, future.result()
+
+def image_features(img_path, meta, size, xyxy, scores, classes, names, dedup_policy='containment', class_agnostic=True):
+    """
+    Filtered, localized Point features for the detections of one image
+    (xyxy (N, 4) in frame pixels, scores, classes; size is the frame (w, h)).
+    Returns (features, sizes_m): sizes_m is the ground size of each detection
+    (longest box side * GSD), used by merge_detections.
+    """
+    w, h = size
+    if not len(xyxy):
+        return [], []
+
+    # --- FILTERING (default: drop boxes completely inside another box, any class) ---
+    keep = np.flatnonzero(dedup_boxes(xyxy, scores, classes, dedup_policy, iou_thresh=0.5, class_agnostic=class_agnostic)).tolist()
+
+    # Bounding Box Centers
+    kept = xyxy[keep]
+    cx = (kept[:, 0] + kept[:, 2]) / 2
+    cy = (kept[:, 1] + kept[:, 3]) / 2
+
+    # 3. Localize (all detections of this image in one call)
+    # pixel_to_geo_batch(lat, lon, alt, px, py, img_w, img_h, focal_mm, sensor_w_mm, yaw_deg)
+    # We assume sensor_w_mm is constant for the drone corpus unless specified
+    try:
+        obj_lats, obj_lons = pixel_to_geo_batch(
+            meta['lat'], meta['lon'], meta['alt'],
+            cx, cy,
+            w, h,
+            meta['focal'],
+            DEFAULT_SENSOR_W,
+            meta['yaw']
+        )
+    except Exception as loc_e:
+        print(f"Localization Calc Error: {loc_e}", file=sys.stderr)
+        return [], []
+
+    # Ground sampling distance (m/px) of this frame
+    gsd_m = (DEFAULT_SENSOR_W * meta['alt']) / (meta['focal'] * w) if meta['focal'] else 0.0
+    sizes_m = (np.maximum(kept[:, 2] - kept[:, 0], kept[:, 3] - kept[:, 1]) * gsd_m).tolist()
 
     features = []
-    
-    for img_path in image_paths:
-        if not os.path.exists(img_path):
+    for i, obj_lat, obj_lon in zip(keep, obj_lats.tolist(), obj_lons.tolist()):
+        features.append({
+            "type": "Feature",
+            "properties": {
+                "label": names[int(classes[i])],
+                "confidence": float(scores[i]),
+                "source": os.path.basename(img_path)
+            },
+            "geometry": {
+                "type": "Point",
+                "coordinates": [obj_lon, obj_lat]
+            }
+        })
+    return features, sizes_m
+
+def _frame_clusters(conf, frames, a, b, dist):
+    """
+    Groups linked detections (edges a-b, dist apart) without chaining: the most confident
+    detection not yet grouped seeds a group and takes, from every other frame, its nearest
+    linked detection not yet grouped. A group therefore holds at most one detection per
+    frame, all within one link of the seed.
+    Returns a label per detection, the smallest index in its group.
+    """
+    n = len(conf)
+    labels = np.full(n, -1, dtype=np.int64)
+
+    # Links of each detection (both directions), nearest first
+    src, dst = np.concatenate([a, b]), np.concatenate([b, a])
+    order = np.lexsort((np.concatenate([dist, dist]), src))
+    src, dst = src[order], dst[order].tolist()
+    starts = np.searchsorted(src, np.arange(n + 1)).tolist()
+    frames = frames.tolist()
+
+    for i in np.lexsort((np.arange(n), -conf)).tolist():
+        if labels[i] >= 0:
             continue
-            
+        members, seen = [i], {frames[i]}
+        for j in dst[starts[i]:starts[i + 1]]:
+            if labels[j] < 0 and frames[j] not in seen:
+                seen.add(frames[j])
+                members.append(j)
+        labels[members] = min(members)
+    return labels
+
+def merge_detections(features, sizes_m, merge_scale=1.0, min_radius_m=MERGE_MIN_RADIUS_M):
+    """
+    Merges detections of the same object seen in several overlapping frames.
+    Each detection gets a radius max(min_radius_m, merge_scale * size); detections of
+    one label from different frames closer than the mean of their radii are linked.
+    Links don't chain: groups are formed around a seed detection (see _frame_clusters),
+    so close but distinct objects stay apart. Every group becomes one Point (confidence
+    weighted position) with the best confidence, the mean confidence, the number of
+    detections and the source frames.
+    Candidate pairs come from the dedup grid index, so this stays near-linear.
+    """
+    n = len(features)
+    if n == 0:
+        return []
+
+    lon = np.array([f['geometry']['coordinates'][0] for f in features], dtype=np.float64)
+    lat = np.array([f['geometry']['coordinates'][1] for f in features], dtype=np.float64)
+    conf = np.array([f['properties']['confidence'] for f in features], dtype=np.float64)
+    _, classes = np.unique([f['properties']['label'] for f in features], return_inverse=True)
+    _, frames = np.unique([f['properties']['source'] for f in features], return_inverse=True)
+
+    # Local metric plane (equirectangular around the flight), fine at flight scale
+    x = lon * METERS_PER_DEG * math.cos(math.radians(float(np.mean(lat))))
+    y = lat * METERS_PER_DEG
+    radius = np.maximum(min_radius_m, merge_scale * np.asarray(sizes_m, dtype=np.float64))
+
+    # Squares of side radius touch whenever the points are within the mean radius (Chebyshev),
+    # the exact distance test follows
+    half = radius / 2
+    a, b = touching_pairs(np.stack([x - half, y - half, x + half, y + half], axis=1), classes)
+    dist = np.hypot(x[a] - x[b], y[a] - y[b])
+    # Detections of one frame are never the same object (each frame is deduplicated already)
+    close = (dist <= half[a] + half[b]) & (frames[a] != frames[b])
+    labels = _frame_clusters(conf, frames, a[close], b[close], dist[close])
+
+    # Aggregate per group (groups numbered in order of first appearance)
+    _, group = np.unique(labels, return_inverse=True)
+    count = np.bincount(group)
+    conf_sum = np.bincount(group, conf)
+    weight = np.where(conf_sum[group] > 0, conf, 1.0) # all-zero confidence: plain mean
+    weight_sum = np.bincount(group, weight)
+    g_lon = np.bincount(group, weight * lon) / weight_sum
+    g_lat = np.bincount(group, weight * lat) / weight_sum
+
+    # Members of each group contiguous, best confidence first
+    order = np.lexsort((-conf, group))
+    starts = np.cumsum(count) - count
+    best = order[starts]
+
+    merged = []
+    for g, i in enumerate(best.tolist()):
+        props = features[i]['properties']
+        if count[g] > 1:
+            members = np.sort(order[starts[g]:starts[g] + count[g]])
+            sources = list(dict.fromkeys(features[j]['properties']['source'] for j in members.tolist()))
+        else:
+            sources = [props['source']]
+        merged.append({
+            "type": "Feature",
+            "properties": {
+                "label": props['label'],
+                "confidence": float(conf[i]),
+                "mean_confidence": float(conf_sum[g] / count[g]),
+                "detections": int(count[g]),
+                "source": props['source'],
+                "sources": sources
+            },
+            "geometry": {
+                "type": "Point",
+                "coordinates": [float(g_lon[g]), float(g_lat[g])]
+            }
+        })
+    return merged
+
+def frame_tiles(frames, tile_size=None, overlap=0.2, skipped=None):
+    """
+    Turns loaded frames into model inputs (x, y, img, (img_path, meta, size, is_last)).
+    With tile_size, frames larger than a tile are sliced into overlapping tiles
+    (tile_windows, same as the orthophoto path), otherwise a frame is one input.
+    Frames that could not be loaded are appended to skipped.
+    """
+    for img_path, frame in frames:
+        if frame is None:
+            if skipped is not None:
+                skipped.append(img_path)
+            continue
+        meta, img = frame
+        h, w = img.shape[:2]
+        if tile_size and (w > tile_size or h > tile_size):
+            windows = tile_windows(w, h, tile_size, overlap)
+        else:
+            windows = tile_windows(w, h, max(w, h))
+        for k, win in enumerate(windows):
+            x, y = int(win.col_off), int(win.row_off)
+            tile = img[y:y + int(win.height), x:x + int(win.width)]
+            yield x, y, tile, (img_path, meta, (w, h), k == len(windows) - 1)
+
+def iter_detection_raw(image_paths, model_path, batch_size=8, batch_pixels=None, workers=4, read_queue=8,
+                       tile_size=None, tile_overlap=0.2, dedup_policy=None, class_agnostic=True,
+                       merge=False, merge_scale=1.0, merge_radius=MERGE_MIN_RADIUS_M, metrics=None):
+    """
+    Detection over raw drone frames, run as a pipeline:
+    loader pool (workers threads, EXIF + decode, read_queue frames ahead) -> batched predict
+    (batch_size inputs per call) -> per-image dedup (dedup_policy, see dedup) + localization.
+    With tile_size, large frames are sliced into tiles (tile_overlap) that go through the
+    model at full resolution, batched across frames, and their detections are deduplicated
+    per frame. dedup_policy defaults to containment for whole frames, hybrid when tiling.
+    Yields records: {"type": "Start"}, the "Feature"s of each image followed by a
+    "Progress" record, and {"type": "End"} with totals.
+    With merge, detections of the same object across frames are merged (merge_detections)
+    and the merged features are yielded after the last image instead.
+    metrics (see metrics.Metrics) collects counters and stage timings, a snapshot is
+    added to the End record (and logged to stderr with each Progress when enabled).
+    """
+    model = get_model(model_path)
+    metrics = metrics or Metrics('raw')
+    if dedup_policy is None:
+        dedup_policy = 'hybrid' if tile_size else 'containment'
+
+    images_total = len(image_paths)
+    totals = {'images_done': 0, 'images_skipped': 0, 'candidates': 0, 'features': 0}
+    held, held_sizes = [], [] # merge: all detections, merged at the end
+    yield {"type": "Start", "model_classes": model.names, "images_total": images_total}
+
+    def progress():
+        metrics.set(**totals)
+        metrics.emit('progress')
+        return {
+            "type": "Progress",
+            "images_done": totals['images_done'],
+            "images_total": images_total,
+            "features": totals['features'],
+        }
+
+    skipped = []
+    def flush_skipped():
+        while skipped:
+            skipped.pop()
+            totals['images_done'] += 1
+            totals['images_skipped'] += 1
+            yield progress()
+
+    # Detections of the frame currently being assembled from its tiles
+    boxes, scores, classes = [], [], []
+    failed = False
+
+    frames = iter_frames(image_paths, workers, read_queue, load=metrics.timed('read', load_frame))
+    tiles = frame_tiles(frames, tile_size, tile_overlap, skipped)
+    for batch in iter_tile_batches(tiles, batch_size, batch_pixels):
+        yield from flush_skipped()
         try:
-            # 1. Get Metadata
-            meta = get_exif_data(img_path)
-            if 'lat' not in meta or 'lon' not in meta:
-                continue # Cannot localize without GPS
-
-            # 2. Read Image
-            img = cv2.imread(img_path)
-            if img is None:
+            with metrics.timer('predict'):
+                results = model.predict([tile[2] for tile in batch], verbose=False, conf=0.25)
+            metrics.count('predict_inputs', len(batch))
+        except Exception as e:
+            print(f"Error predicting batch ({batch[0][3][0]} ...): {e}", file=sys.stderr)
+            results = [None] * len(batch)
+
+        for (x, y, _, (img_path, meta, size, is_last)), r in zip(batch, results):
+            if r is None:
+                failed = True
+            elif len(r.boxes):
+                # Tile -> frame pixel coordinates
+                boxes.append(r.boxes.xyxy.cpu().numpy().astype(np.float64).reshape(-1, 4) + [x, y, x, y])
+                scores.append(r.boxes.conf.cpu().numpy().astype(np.float64).reshape(-1))
+                classes.append(r.boxes.cls.cpu().numpy().astype(np.int64).reshape(-1))
+            if not is_last:
                 continue
-            h, w = img.shape[:2]
-
-            # 3. Predict
-            results = model.predict(img, verbose=False, conf=0.25)
-            
-            # --- FILTERING LOGIC START ---
-            all_boxes = []
-            for r in results:
-                for box in r.boxes:
-                     # xyxy format: x1, y1, x2, y2
-                    b = box.xyxy[0].tolist()
-                    all_boxes.append({
-                        'box': b,
-                        'obj': box
-                    })
-
-            # Check for containment
-            # A box is kept if it is NOT completely inside any other box
-            valid_boxes = []
-            for i, item_a in enumerate(all_boxes):
-                is_inside = False
-                ax1, ay1, ax2, ay2 = item_a['box']
-                
-                for j, item_b in enumerate(all_boxes):
-                    if i == j: continue
-                    bx1, by1, bx2, by2 = item_b['box']
-                    
-                    # Check if A is inside B
-                    # We might want strict inequality or not. Usually strict on at least one side prevents
-                    # identical boxes from deleting each other (mutual containment).
-                    # But if identical, we probably want to keep one. 
-                    # Let's say: if A is inside B, eliminate A.
-                    # Handle exact duplicates: eliminate if i > j (keep first occurrence)
-                    
-                    if ax1 >= bx1 and ay1 >= by1 and ax2 <= bx2 and ay2 <= by2:
-                        # A is inside B
-                        # Check for exact equality to avoid deleting both or keeping duplicates
-                        if ax1 == bx1 and ay1 == by1 and ax2 == bx2 and ay2 == by2:
-                             if i > j: 
-                                 is_inside = True
-                                 break
-                        else:
-                            is_inside = True
-                            break
-                            
-                if not is_inside:
-                    valid_boxes.append(item_a['obj'])
-            
-            # --- FILTERING LOGIC END ---
-
-            for box in valid_boxes:
-                # Bounding Box Center
-                bx1, by1, bx2, by2 = box.xyxy[0].tolist()
-                cx = (bx1 + bx2) / 2
-                cy = (by1 + by2) / 2
-                
-                label = model.names[int(box.cls[0])]
-                conf = float(box.conf[0])
-                
-                # 4. Localize
-                # pixel_to_geo(lat, lon, alt, px, py, img_w, img_h, focal_mm, sensor_w_mm, yaw_deg)
-                # We assume sensor_w_mm is constant for the drone corpus unless specified
-                try:
-                    obj_lat, obj_lon = pixel_to_geo(
-                        meta['lat'], meta['lon'], meta['alt'],
-                        cx, cy,
-                        w, h,
-                        meta['focal'],
-                        DEFAULT_SENSOR_W,
-                        meta['yaw']
+
+            totals['images_done'] += 1
+            if failed:
+                totals['images_skipped'] += 1
+            elif boxes:
+                xyxy = np.concatenate(boxes)
+                totals['candidates'] += len(xyxy)
+                # Dedup + localization
+                with metrics.timer('postprocess'):
+                    features, sizes_m = image_features(
+                        img_path, meta, size,
+                        xyxy, np.concatenate(scores), np.concatenate(classes),
+                        model.names, dedup_policy, class_agnostic
                     )
-                    
-                    feature = {
-                        "type": "Feature",
-                        "properties": {
-                            "label": label,
-                            "confidence": conf,
-                            "source": os.path.basename(img_path)
-                        },
-                        "geometry": {
-                            "type": "Point",
-                            "coordinates": [obj_lon, obj_lat]
-                        }
-                    }
-                    features.append(feature)
-                except Exception as loc_e:
-                    print(f"Localization Calc Error: {loc_e}", file=sys.stderr)
+                totals['features'] += len(features)
+                if merge:
+                    held.extend(features)
+                    held_sizes.extend(sizes_m)
+                else:
+                    yield from features
+            boxes, scores, classes = [], [], []
+            failed = False
+            yield progress()
+    yield from flush_skipped()
 
-        except Exception as e:
-            print(f"Error processing {img_path}: {e}", file=sys.stderr)
-            continue
+    end = {
+        "type": "End",
+        "images_total": images_total,
+        "images_skipped": totals['images_skipped'],
+        "features": totals['features'],
+    }
+    if merge:
+        with metrics.timer('merge'):
+            merged = merge_detections(held, held_sizes, merge_scale, merge_radius)
+        yield from merged
+        end["detections"] = totals['features']
+        end["features"] = len(merged)
+    metrics.set(**totals)
+    end["metrics"] = metrics.snapshot()
+    metrics.emit('end')
+    yield end
+
+def run_detection_raw(image_paths, model_path, emit=None, **opts):
+    """
+    Runs iter_detection_raw and returns the GeoJSON FeatureCollection.
+    With emit, every record is handed to emit(record) as it is produced instead
+    (streaming mode) and the returned collection carries no features.
+    """
+    # Load model (cached, iter_detection_raw gets the same instance)
+    try:
+        get_model(model_path)
+    except Exception as e:
+        print(f"Error loading model {model_path}: {e}", file=sys.stderr)
+        return {"type": "FeatureCollection", "features": []}
 
-    return {
+    geojson = {
         "type": "FeatureCollection",
-        "features": features
+        "features": []
     }
+    for record in iter_detection_raw(image_paths, model_path, **opts):
+        if emit is not None:
+            emit(record)
+        elif record['type'] == 'Feature':
+            geojson['features'].append(record)
+
+    return geojson
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--images', nargs='+', required=True) # List of image paths
     parser.add_argument('--model', default='../best.pt')
+    parser.add_argument('--batch-size', type=int, default=8, help='Frames (or tiles) per model.predict call')
+    parser.add_argument('--batch-pixels', type=int, default=None, help='Max total input pixels per batch (optional)')
+    parser.add_argument('--workers', type=int, default=4, help='Threads reading EXIF and decoding frames')
+    parser.add_argument('--read-queue', type=int, default=8, help='Frames loaded ahead of inference')
+    parser.add_argument('--tile-size', type=int, default=None, help='Slice frames larger than this into tiles (e.g. the model input size)')
+    parser.add_argument('--tile-overlap', type=float, default=0.2, help='Fraction of a tile shared with its neighbour')
+    parser.add_argument('--dedup', choices=POLICIES, default=None, help='How overlapping detections are merged (default: containment, hybrid when tiling)')
+    parser.add_argument('--class-agnostic', action=argparse.BooleanOptionalAction, default=True, help='Let detections of different classes suppress each other')
+    parser.add_argument('--merge', action='store_true', help='Merge detections of the same object seen in several frames')
+    parser.add_argument('--merge-scale', type=float, default=1.0, help='Merge distance in object sizes (ground size from GSD)')
+    parser.add_argument('--merge-radius', type=float, default=MERGE_MIN_RADIUS_M, help='Minimum merge distance in meters')
+    parser.add_argument('--stream', action='store_true', help='Write newline-delimited records (features, progress) as they are ready')
+    parser.add_argument('--metrics', action='store_true', help='Log JSON metrics (counters, stage timings) to stderr with every progress record')
+    parser.add_argument('--profile', default=None, metavar='PATH', help='Run under cProfile and write the stats to PATH')
     args = parser.parse_args()
-    
+
     # print(f"Processing {len(args.images)} images...", file=sys.stderr)
-    
-    geojson = run_detection_raw(args.images, args.model)
-    print(json.dumps(geojson))
+
+    emit = None
+    if args.stream:
+        def emit(record):
+            sys.stdout.write(json.dumps(record) + "\n")
+            sys.stdout.flush()
+
+    with profiled(args.profile):
+        geojson = run_detection_raw(
+            args.images, args.model,
+            batch_size=args.batch_size,
+            batch_pixels=args.batch_pixels,
+            workers=args.workers,
+            read_queue=args.read_queue,
+            tile_size=args.tile_size,
+            tile_overlap=args.tile_overlap,
+            dedup_policy=args.dedup,
+            class_agnostic=args.class_agnostic,
+            merge=args.merge,
+            merge_scale=args.merge_scale,
+            merge_radius=args.merge_radius,
+            metrics=Metrics('raw', log=args.metrics or None),
+            emit=emit,
+        )
+    if not args.stream:
+        print(json.dumps(geojson))
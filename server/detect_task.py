@@ -3,12 +3,26 @@ import sys
 import argparse
 import requests
 import json
+import queue
+import base64
+import threading
+import time
+import cv2
 import rasterio
 import numpy as np
-from ultralytics import YOLO
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from rasterio.enums import Resampling
 from rasterio.windows import Window
-from dotenv import load_dotenv
+from rasterio.features import geometry_window, rasterize
+from rasterio.warp import transform_geom
+from rasterio.errors import WindowError
+from model_cache import get_model
+from asset_cache import fetch_asset
+from metrics import Metrics, profiled
+from tile_cache import run_key, load_tiles, store_tiles
+from dedup import POLICIES, interaction_groups, touching_pairs, filter_candidates
+from tiling import tile_windows, tile_interiors, iter_tile_batches
 
 # explicitly load from current dir (server/)
 env_path = os.path.join(os.path.dirname(__file__), '.env')
@@ -34,119 +48,432 @@ def get_auth_headers():
         print(f"Auth Error: {e}", file=sys.stderr)
     return {}
 
-def download_file(url, local_filename, headers):
-    with requests.get(url, headers=headers, stream=True) as r:
-        r.raise_for_status()
-        with open(local_filename, 'wb') as f:
-            for chunk in r.iter_content(chunk_size=8192):
-                f.write(chunk)
-    return local_filename
-
-def compute_iou(boxA, boxB):
-    # Determine the (x, y)-coordinates of the intersection rectangle
-    xA = max(boxA[0], boxB[0])
-    yA = max(boxA[1], boxB[1])
-    xB = min(boxA[2], boxB[2])
-    yB = min(boxA[3], boxB[3])
-
-    # Compute the area of intersection rectangle
-    interWidth = max(0, xB - xA)
-    interHeight = max(0, yB - yA)
-    interArea = interWidth * interHeight
+def split_final(candidates, next_y, class_agnostic=False):
+    """
+    Streaming dedup helper. Tiles arrive row by row, so once every tile above next_y
+    is done no future candidate can start above it. A group of touching boxes
+    (interaction_groups) is final when none of its boxes reaches next_y: filtering
+    it now gives the same result as filtering the whole map at the end.
+    class_agnostic must match the dedup setting (groups then span classes).
+    next_y=None finalizes everything. Returns (final, still_pending).
+    """
+    if next_y is None or not candidates:
+        return list(candidates), []
 
-    if interArea == 0:
-        return 0
+    n = len(candidates)
+    boxes = np.array([c['bbox'] for c in candidates], dtype=np.float64).reshape(n, 4)
+    classes = np.zeros(n, dtype=np.int64) if class_agnostic else np.array([c['cls'] for c in candidates])
+    labels = interaction_groups(boxes, classes)
 
-    # Compute the area of both the prediction and ground-truth rectangles
-    boxAArea = (boxA[2] - boxA[0]) * (boxA[3] - boxA[1])
-    boxBArea = (boxB[2] - boxB[0]) * (boxB[3] - boxB[1])
+    group_bottom = np.full(n, -np.inf)
+    np.maximum.at(group_bottom, labels, boxes[:, 3])
+    is_open = group_bottom[labels] >= next_y
 
-    # Compute the intersection over union
-    iou = interArea / float(boxAArea + boxBArea - interArea)
-    return iou
+    final = [c for c, o in zip(candidates, is_open) if not o]
+    pending = [c for c, o in zip(candidates, is_open) if o]
+    return final, pending
 
-def apply_hybrid_filter(candidates, iou_thresh=0.5):
+def split_interior(candidates, interior, class_agnostic=False):
     """
-    Hybrid deduplication:
-    1. STRICT CONTAINMENT (User Request): If A is inside B, remove A.
-    2. NMS (Standard): If A overlaps B significantly (IoU > thresh), remove lower conf.
+    Splits one tile's candidates by the tile's interior (see tile_interiors).
+    A group of touching boxes that lies strictly inside it can't meet a detection of
+    another tile, so it can be filtered right away; groups reaching into the overlap
+    band wait for the cross-tile dedup. Returns (inner, band).
     """
     if not candidates:
-        return []
-
-    # Sort by confidence descending (crucial for NMS)
-    candidates = sorted(candidates, key=lambda x: x['conf'], reverse=True)
+        return [], []
 
     n = len(candidates)
-    keep = [True] * n
+    boxes = np.array([c['bbox'] for c in candidates], dtype=np.float64).reshape(n, 4)
+    classes = np.zeros(n, dtype=np.int64) if class_agnostic else np.array([c['cls'] for c in candidates])
+    labels = interaction_groups(boxes, classes)
 
-    for i in range(n):
-        if not keep[i]: continue
+    ix1, iy1, ix2, iy2 = interior
+    outside = ~((boxes[:, 0] > ix1) & (boxes[:, 1] > iy1) & (boxes[:, 2] < ix2) & (boxes[:, 3] < iy2))
+    group_band = np.zeros(n, dtype=bool)
+    np.logical_or.at(group_band, labels, outside)
+    in_band = group_band[labels]
 
-        boxA = candidates[i]['bbox']
+    inner = [c for c, b in zip(candidates, in_band) if not b]
+    band = [c for c, b in zip(candidates, in_band) if b]
+    return inner, band
 
-        for j in range(i + 1, n): # Compare with subsequent (lower conf or same)
-            if not keep[j]: continue
+def has_data(src, window, decimation=16):
+    """
+    Cheap footprint check: reads the dataset mask (alpha band / nodata) of window at
+    1/decimation resolution (served from mask overviews when the GeoTIFF has them).
+    False means the window is entirely outside the orthophoto.
+    """
+    out_shape = (max(1, int(window.height) // decimation), max(1, int(window.width) // decimation))
+    mask = src.dataset_mask(window=window, out_shape=out_shape)
+    return bool(mask.any())
 
-            # We only filter if same class (usually)
-            # If user wants to remove 'Tank' inside 'Vehicle', we need to relax this.
-            # Assuming same class for 'Double Bounding Box' error.
-            if candidates[i]['cls'] != candidates[j]['cls']:
-                continue
+class AreaOfInterest:
+    """
+    Part of the orthophoto to run on, given in EPSG:4326 as a
+    [min_lon, min_lat, max_lon, max_lat] bbox or a GeoJSON (Multi)Polygon geometry.
+    Holds its pixel window and a coarse (1/decimation) raster mask of the shape.
+    An area outside the orthophoto touches no tiles.
+    """
+    def __init__(self, src, aoi, decimation=16):
+        if isinstance(aoi, (list, tuple)):
+            min_lon, min_lat, max_lon, max_lat = aoi
+            aoi = {
+                "type": "Polygon",
+                "coordinates": [[[min_lon, min_lat], [max_lon, min_lat], [max_lon, max_lat], [min_lon, max_lat], [min_lon, min_lat]]]
+            }
+        self.geometry = transform_geom("EPSG:4326", src.crs, aoi)
+        self.decimation = decimation
+        self.raster_size = (src.width, src.height)
+        try:
+            self.window = geometry_window(src, [self.geometry])
+        except WindowError:
+            # Outside the orthophoto: no tiles, the run just reports nothing
+            print("[AOI] Area of interest does not intersect the orthophoto", file=sys.stderr)
+            self.window = Window(0, 0, 0, 0)
+            self.origin = (0, 0)
+            self.mask = np.zeros((1, 1), dtype=bool)
+            return
+
+        col_off, row_off = int(self.window.col_off), int(self.window.row_off)
+        out_shape = (int(self.window.height) // decimation + 1, int(self.window.width) // decimation + 1)
+        coarse_transform = src.window_transform(self.window) * rasterio.Affine.scale(decimation)
+        self.origin = (col_off, row_off)
+        self.mask = rasterize([self.geometry], out_shape=out_shape, transform=coarse_transform,
+                              all_touched=True, dtype='uint8').astype(bool)
+
+    def tiles(self, tile_size=1280, overlap=0):
+        # Tiles of the whole-raster grid that touch the shape: the same tiles a run without
+        # an AOI uses, so cached tile results (see tile_cache) carry over when the AOI changes
+        windows = tile_windows(*self.raster_size, tile_size, overlap)
+        return [w for w in windows if self.touches(w)]
+
+    def touches(self, window):
+        d = self.decimation
+        x0, y0 = int(window.col_off) - self.origin[0], int(window.row_off) - self.origin[1]
+        x1, y1 = x0 + int(window.width), y0 + int(window.height)
+        if x1 <= 0 or y1 <= 0:
+            return False
+        return bool(self.mask[max(0, y0) // d:y1 // d + 1, max(0, x0) // d:x1 // d + 1].any())
+
+    def contains(self, x, y):
+        d = self.decimation
+        row, col = (int(y) - self.origin[1]) // d, (int(x) - self.origin[0]) // d
+        return 0 <= row < self.mask.shape[0] and 0 <= col < self.mask.shape[1] and bool(self.mask[row, col])
+
+def remote_gdal_env(headers):
+    """
+    GDAL options for reading a WebODM asset over HTTP range requests (/vsicurl/)
+    with our auth headers. Only windows that are actually read get transferred
+    (WebODM orthophotos are Cloud Optimized GeoTIFFs).
+    """
+    return {
+        'GDAL_HTTP_HEADERS': "\r\n".join(f"{k}: {v}" for k, v in headers.items()),
+        'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+        'GDAL_HTTP_MERGE_CONSECUTIVE_RANGES': 'YES',
+        'GDAL_HTTP_MULTIPLEX': 'YES',
+        'CPL_VSIL_CURL_ALLOWED_EXTENSIONS': '.tif',
+        'VSI_CACHE': 'TRUE',
+    }
 
-            boxB = candidates[j]['bbox']
+def with_gdal_env(items, gdal_env):
+    # GDAL config options are per thread: enter the env in whichever thread iterates
+    with rasterio.Env(**gdal_env):
+        yield from items
 
-            # Check 1: Containment
-            # Check if B is inside A (Since i is current/higher conf kept, we usually keep i)
-            # OR Check if A is inside B (Shouldn't happen if sorted by conf?
-            # Actually conf doesn't dictate size. Small high-conf box vs Large low-conf box)
+def read_tiles(src, windows, skip_empty=True, stats=None, decimation=1):
+    """
+    Yields (x, y, img) for every window of an open rasterio dataset.
+    img is (H, W, 3) RGB (alpha dropped).
+    With skip_empty, windows with no valid pixels (see has_data) are never read.
+    decimation > 1 reads windows at 1/decimation resolution (GDAL serves these from
+    the overviews when the file has them).
+    stats (dict) receives 'tiles_total' / 'tiles_skipped' counts.
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault('tiles_total', 0)
+    stats.setdefault('tiles_skipped', 0)
+
+    for window in windows:
+        x, y = int(window.col_off), int(window.row_off)
+        stats['tiles_total'] += 1
+
+        # Check for empty window/nodata
+        if skip_empty and not has_data(src, window):
+            stats['tiles_skipped'] += 1
+            continue
+
+        if decimation > 1:
+            out_shape = (src.count, max(1, round(window.height / decimation)), max(1, round(window.width / decimation)))
+            img = src.read(window=window, out_shape=out_shape, resampling=Resampling.average)
+        else:
+            img = src.read(window=window) # (Channels, H, W)
+        img = np.moveaxis(img, 0, -1) # (H, W, Channels)
+
+        # Use only RGB (drop Alpha if exists)
+        if img.shape[2] > 3:
+            img = img[:, :, :3]
+
+        yield x, y, img
+
+def prefetch(items, depth=4):
+    """
+    Iterates items in a background thread, keeping at most depth of them buffered
+    in a bounded queue. Used to overlap raster reads (GIL released) with inference.
+    """
+    buf = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+
+    def producer():
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                buf.put((True, item))
+        except Exception as e:
+            buf.put((False, e))
+            return
+        buf.put((False, None))
+
+    thread = threading.Thread(target=producer, name='tile-reader', daemon=True)
+    thread.start()
+    try:
+        while True:
+            ok, item = buf.get()
+            if not ok:
+                if item is not None:
+                    raise item
+                return
+            yield item
+    finally:
+        # Consumer stopped early (or errored): unblock the producer if it waits on a full queue
+        stop.set()
+        while thread.is_alive():
+            try:
+                buf.get_nowait()
+            except queue.Empty:
+                thread.join(0.05)
+
+class CropStore:
+    """
+    Detection crops written as JPEG files under root (one directory per task),
+    referenced from features by URL instead of inline base64.
+    """
+    def __init__(self, root, url_prefix):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip('/')
+        os.makedirs(root, exist_ok=True)
+        # A rerun replaces the previous run's crops
+        for name in os.listdir(root):
+            if name.endswith('.jpg'):
+                os.remove(os.path.join(root, name))
+        self._count = 0
+
+    def reserve(self):
+        # Called from the main thread so names stay in emission order
+        name = f"{self._count}.jpg"
+        self._count += 1
+        return name
+
+    def write(self, name, jpeg):
+        with open(os.path.join(self.root, name), 'wb') as f:
+            f.write(jpeg)
+        return f"{self.url_prefix}/{name}"
+
+def read_crop(src, bbox):
+    """
+    Reads the RGB pixels under a global pixel bbox, (H, W, C) or None if empty.
+    """
+    gx1, gy1, gx2, gy2 = bbox
+    ix1, iy1 = max(0, int(gx1)), max(0, int(gy1))
+    ix2, iy2 = min(src.width, int(gx2)), min(src.height, int(gy2))
+    if ix2 <= ix1 or iy2 <= iy1:
+        return None
+    bands = list(range(1, min(3, src.count) + 1))
+    crop = src.read(indexes=bands, window=Window(ix1, iy1, ix2 - ix1, iy2 - iy1))
+    return np.moveaxis(crop, 0, -1)
+
+def encode_crop(crop, store=None, name=None):
+    """
+    RGB crop -> {'image_url': ...} when written to a CropStore, else {'image': base64 JPEG}.
+    """
+    jpeg = None
+    if crop is not None:
+        try:
+            crop_bgr = cv2.cvtColor(crop, cv2.COLOR_RGB2BGR)
+            ret, buf = cv2.imencode('.jpg', crop_bgr)
+            if ret:
+                jpeg = buf.tobytes()
+        except Exception:
+            pass
+
+    if store is not None:
+        return {'image_url': store.write(name, jpeg) if jpeg is not None else None}
+    return {'image': base64.b64encode(jpeg).decode('utf-8') if jpeg is not None else None}
+
+def project_bboxes(bboxes, transform, transformer):
+    """
+    Pixel bboxes (N, 4: x1, y1, x2, y2) -> (N, 4, 2) lon/lat corners, clockwise from top-left.
+    One affine pass over all corners and a single pyproj call for the whole batch.
+    """
+    b = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
 
-            # Let's check mutual containment or overlap
+    # Corner order: (x1,y1), (x2,y1), (x2,y2), (x1,y2)
+    cols = b[:, [0, 2, 2, 0]]
+    rows = b[:, [1, 1, 3, 3]]
 
-            # Is B inside A?
-            b_in_a = (boxB[0] >= boxA[0] and boxB[1] >= boxA[1] and boxB[2] <= boxA[2] and boxB[3] <= boxA[3])
+    # 1. Pixel -> Projected (same arithmetic as Affine * (col, row))
+    xs = cols * transform.a + rows * transform.b + transform.c
+    ys = cols * transform.d + rows * transform.e + transform.f
 
-            # Is A inside B?
-            a_in_b = (boxA[0] >= boxB[0] and boxA[1] >= boxB[1] and boxA[2] <= boxB[2] and boxA[3] <= boxB[3])
+    # 2. Projected -> Lat/Lon (using PyProj)
+    lons, lats = transformer.transform(xs.ravel(), ys.ravel())
+    return np.stack([np.asarray(lons), np.asarray(lats)], axis=-1).reshape(-1, 4, 2)
 
-            if b_in_a or a_in_b:
-                # Containment detected. Remove the contained one?
-                # Usually we keep the one with higher confidence (A).
-                # But if the User wants "Small box inside Large box removed", we might remove the *inner* one regardless of confidence?
-                # User prompted: "remove the bounding box that is inside"
-                # If A is inside B, remove A.
-                # If B is inside A, remove B.
+def candidate_to_feature(c, corners):
+    """
+    Candidate + its projected corners (4 x [lon, lat], see project_bboxes)
+    -> GeoJSON Polygon feature in EPSG:4326.
+    """
+    (lon1, lat1), (lon2, lat2), (lon3, lat3), (lon4, lat4) = corners
 
-                if b_in_a:
-                    print(f"[DEBUG] Box {j} inside {i}. Removing {j} (Containment)", file=sys.stderr)
-                    keep[j] = False
-                    continue
+    # Calculate Centroid
+    c_lon = (lon1 + lon2 + lon3 + lon4) / 4.0
+    c_lat = (lat1 + lat2 + lat3 + lat4) / 4.0
 
-                if a_in_b:
-                    print(f"[DEBUG] Box {i} inside {j}. Removing {i} (Containment)", file=sys.stderr)
-                    keep[i] = False
-                    break # Stop processing A
+    properties = {
+        "label": c['label'],
+        "confidence": c['conf'],
+    }
+    properties.update(c['crop']) # image (base64) or image_url
+    properties["centroid"] = [c_lat, c_lon]
 
-            # Check 2: IoU (Overlap)
-            iou = compute_iou(boxA, boxB)
-            if iou > iou_thresh:
-                 # Remove B (since it has lower/equal confidence)
-                 print(f"[DEBUG] Box {j} overlaps {i} (IoU={iou:.2f}). Removing {j} (NMS)", file=sys.stderr)
-                 keep[j] = False
+    return {
+        "type": "Feature",
+        "properties": properties,
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [[
+                [lon1, lat1],
+                [lon2, lat2],
+                [lon3, lat3],
+                [lon4, lat4],
+                [lon1, lat1]
+            ]]
+        }
+    }
 
-    return [candidates[i] for i in range(n) if keep[i]]
+def coarse_select(src, model, windows, region=None, tile_size=1280, overlap=0, factor=4, conf=0.1, margin=64,
+                  skip_empty=True, batch_size=8, read_queue=4, gdal_env=None):
+    """
+    Coarse pass of the coarse-to-fine mode: runs the model on a 1/factor resolution view
+    of the orthophoto (tiles of tile_size * factor pixels read at tile_size) and keeps
+    the full resolution windows that a coarse detection, grown by margin pixels, touches.
+    Returns (selected windows, stats).
+    """
+    started = time.time()
+    big = tile_size * factor
+    if region is not None:
+        coarse_windows = region.tiles(big, overlap)
+    else:
+        coarse_windows = tile_windows(src.width, src.height, big, overlap)
+    sizes = {(int(w.col_off), int(w.row_off)): (int(w.width), int(w.height)) for w in coarse_windows}
+
+    # Coarse hits painted on a grid of cell x cell pixels (conservative: whole cells)
+    cell = 16 * factor
+    hits = np.zeros((src.height // cell + 1, src.width // cell + 1), dtype=bool)
+
+    tile_stats = {'tiles_total': 0, 'tiles_skipped': 0}
+    candidates = 0
+    tiles = prefetch(with_gdal_env(read_tiles(src, coarse_windows, skip_empty, tile_stats, factor), gdal_env), read_queue)
+    for batch in iter_tile_batches(tiles, batch_size):
+        results = model.predict([tile[2] for tile in batch], verbose=False, conf=conf)
+        for (x, y, img), r in zip(batch, results):
+            if not len(r.boxes):
+                continue
+            w, h = sizes[(x, y)]
+            sx, sy = w / img.shape[1], h / img.shape[0]
+            for bx1, by1, bx2, by2 in r.boxes.xyxy.cpu().numpy().astype(np.float64).reshape(-1, 4).tolist():
+                gx1 = max(0, int((x + bx1 * sx - margin) // cell))
+                gy1 = max(0, int((y + by1 * sy - margin) // cell))
+                gx2 = int((x + bx2 * sx + margin) // cell)
+                gy2 = int((y + by2 * sy + margin) // cell)
+                hits[gy1:gy2 + 1, gx1:gx2 + 1] = True
+                candidates += 1
+
+    selected = []
+    for w in windows:
+        x0, y0 = int(w.col_off), int(w.row_off)
+        if hits[y0 // cell:(y0 + int(w.height)) // cell + 1, x0 // cell:(x0 + int(w.width)) // cell + 1].any():
+            selected.append(w)
+
+    stats = {
+        "factor": factor,
+        "tiles": len(coarse_windows),
+        "tiles_skipped": tile_stats['tiles_skipped'],
+        "candidates": candidates,
+        "tiles_full": len(windows),
+        "tiles_selected": len(selected),
+        "seconds": round(time.time() - started, 3),
+    }
+    print(f"[COARSE] {candidates} coarse candidates -> {len(selected)}/{len(windows)} full resolution tiles", file=sys.stderr)
+    return selected, stats
+
+# Confidence threshold of the full resolution predict calls (part of the tile cache key)
+PREDICT_CONF = 0.25
 
-def run_inference(tif_path, model_path, tile_size=1280, overlap=0):
-    print("MODEL PATH", model_path)
-    model = YOLO(model_path)
-    global_candidates = [] # Store all detections here before NMS
+def tile_detections(boxes):
+    """
+    ultralytics Boxes of one tile -> (N, 6) float64 array: x1, y1, x2, y2, class, confidence.
+    """
+    return np.concatenate([
+        boxes.xyxy.cpu().numpy().astype(np.float64).reshape(-1, 4),
+        boxes.cls.cpu().numpy().astype(np.float64).reshape(-1, 1),
+        boxes.conf.cpu().numpy().astype(np.float64).reshape(-1, 1),
+    ], axis=1)
+
+def iter_inference(tif_path, model_path, tile_size=1280, overlap=0, batch_size=8, batch_pixels=None,
+                   read_queue=4, encode_workers=4, encode_queue=256, debug_filter=False, skip_empty=True,
+                   crop_store=None, aoi=None, gdal_env=None, dedup_policy='hybrid', class_agnostic=False,
+                   coarse_factor=None, coarse_conf=0.1, coarse_margin=64, metrics=None, tile_cache=True):
+    """
+    Tiled inference over an orthophoto, run as a pipeline:
+    reader thread (prefetch, read_queue tiles) -> batched predict -> dedup -> crop encoding pool
+    (encode_workers threads, at most encode_queue crops in flight).
+    skip_empty skips tiles outside the orthophoto footprint without reading them.
+    Crops are only cut for detections that survive dedup, read back from the raster.
+    With crop_store (CropStore) they are written to files and features carry image_url.
+    aoi (see AreaOfInterest) limits tiles, and detections, to an area of interest.
+    gdal_env holds GDAL options for remote paths (see remote_gdal_env).
+    dedup_policy / class_agnostic select how overlapping detections are merged (see dedup).
+    coarse_factor enables the coarse-to-fine mode for sparse targets: a first pass at
+    1/coarse_factor resolution (conf coarse_conf) picks the tiles that are then run at full
+    resolution (see coarse_select, coarse_report to tune it).
+    metrics (see metrics.Metrics) collects counters and stage timings, a snapshot is
+    added to the End record (and logged to stderr with each Progress when enabled).
+    With tile_cache, the raw detections of every tile are cached (see tile_cache) and
+    tiles already run with the same orthophoto, model, tile size and overlap are not
+    read or inferred again. Local orthophotos only.
+
+    Dedup is split by tile: detections away from the overlap bands are filtered per tile
+    (split_interior), only band detections go through the cross-tile dedup.
+
+    Yields records: {"type": "Start"} first, then "Feature"s as soon as the dedup of
+    their region is final (see split_final), a "Progress" record after every tile row,
+    and {"type": "End"} with totals.
+    """
+    print("MODEL PATH", model_path, file=sys.stderr)
+    model = get_model(model_path)
+    metrics = metrics or Metrics('inference')
 
     # Prepare CRS Transformer (Projected -> Lat/Lon)
     from pyproj import Transformer
 
-    with rasterio.open(tif_path) as src:
-        width = src.width
-        height = src.height
+    gdal_env = gdal_env or {}
+    with rasterio.Env(**gdal_env), rasterio.open(tif_path) as src, rasterio.open(tif_path) as crop_src, \
+            ThreadPoolExecutor(max_workers=max(1, encode_workers), thread_name_prefix='crop-encoder') as encoder:
+        # src is read by the prefetch thread, crop_src by this one (datasets aren't thread safe)
         transform = src.transform
         src_crs = src.crs
 
@@ -154,162 +481,380 @@ def run_inference(tif_path, model_path, tile_size=1280, overlap=0):
         # Always allow_ballpark=True for approximate if grid missing
         transformer = Transformer.from_crs(src_crs, "EPSG:4326", always_xy=True)
 
-        step = int(tile_size * (1 - overlap))
-
-        for y in range(0, height, step):
-            for x in range(0, width, step):
-                # Define Window
-                w = min(tile_size, width - x)
-                h = min(tile_size, height - y)
-                window = Window(x, y, w, h)
-
-                # Check for empty window/nodata
-                img = src.read(window=window) # (Channels, H, W)
-                img = np.moveaxis(img, 0, -1) # (H, W, Channels)
-
-                # Use only RGB (drop Alpha if exists)
-                if img.shape[2] > 3:
-                    img = img[:, :, :3]
-
-                # Run Inference
-                results = model.predict(img, verbose=False, conf=0.25)
-
-                for r in results:
-                    for box in r.boxes:
-                        # Local Coords
-                        bx1, by1, bx2, by2 = box.xyxy[0].tolist()
-                        cls = int(box.cls[0])
-                        conf = float(box.conf[0])
-                        label = model.names[cls]
-
-                        # Global Pixel Coords
-                        gx1 = x + bx1
-                        gy1 = y + by1
-                        gx2 = x + bx2
-                        gy2 = y + by2
-
-                        # Store Candidate
-                        global_candidates.append({
-                            'bbox': [gx1, gy1, gx2, gy2], # Global Pixel Box
-                            'local_bbox': [bx1, by1, bx2, by2], # Local for cropping
-                            'tile_offset': (x, y),
-                            'cls': cls,
-                            'label': label,
-                            'conf': conf,
-                            'start_img': img # Reference to tile image for cropping later (Careful with memory? Tile loop implies img changes. Need to copy or crop now?)
-                        })
-                        # IMPORTANT: storing 'img' reference is bad because loop continues.
-                        # We must extract crop NOW or store copy. Storing full tile copy is memory heavy.
-                        # Strategy: Extract crop NOW, store b64 (or raw), then NMS.
-
-                        # Extract Crop Immediately
-                        ibx1, iby1, ibx2, iby2 = int(bx1), int(by1), int(bx2), int(by2)
-                        ibx1, iby1 = max(0, ibx1), max(0, iby1)
-                        ibx2, iby2 = min(img.shape[1], ibx2), min(img.shape[0], iby2)
-
-                        crop_b64 = None
-                        if ibx2 > ibx1 and iby2 > iby1:
-                            import cv2
-                            import base64
-                            crop = img[iby1:iby2, ibx1:ibx2]
-                            try:
-                                crop_bgr = cv2.cvtColor(crop, cv2.COLOR_RGB2BGR)
-                                ret, buf = cv2.imencode('.jpg', crop_bgr)
-                                if ret:
-                                    crop_b64 = base64.b64encode(buf).decode('utf-8')
-                            except: pass
-
-                        global_candidates[-1]['image'] = crop_b64
-                        del global_candidates[-1]['start_img'] # Remove ref
-
-    print(f"[DEBUG] Total candidates before Hybrid Filter: {len(global_candidates)}", file=sys.stderr)
-
-    # --- APPLY HYBRID FILTER (Containment + NMS) ---
-    final_candidates = apply_hybrid_filter(global_candidates, iou_thresh=0.5)
-
-    print(f"[DEBUG] Total candidates after Hybrid Filter: {len(final_candidates)}", file=sys.stderr)
-
-    features = []
-    for c in final_candidates:
-        gx1, gy1, gx2, gy2 = c['bbox']
-
-        # 1. Pixel -> Projected (using Rasterio transform)
-        # Affine * (col, row) -> (x, y)
-        px1, py1 = transform * (gx1, gy1)
-        px2, py2 = transform * (gx2, gy1)
-        px3, py3 = transform * (gx2, gy2)
-        px4, py4 = transform * (gx1, gy2)
-
-        # 2. Projected -> Lat/Lon (using PyProj)
-        lon1, lat1 = transformer.transform(px1, py1)
-        lon2, lat2 = transformer.transform(px2, py2)
-        lon3, lat3 = transformer.transform(px3, py3)
-        lon4, lat4 = transformer.transform(px4, py4)
-
-        # Calculate Centroid
-        c_lon = (lon1 + lon2 + lon3 + lon4) / 4.0
-        c_lat = (lat1 + lat2 + lat3 + lat4) / 4.0
-
-        feature = {
-            "type": "Feature",
-            "properties": {
-                "label": c['label'],
-                "confidence": c['conf'],
-                "image": c['image'],
-                "centroid": [c_lat, c_lon]
-            },
-            "geometry": {
-                "type": "Polygon",
-                "coordinates": [[
-                    [lon1, lat1],
-                    [lon2, lat2],
-                    [lon3, lat3],
-                    [lon4, lat4],
-                    [lon1, lat1]
-                ]]
+        region = AreaOfInterest(src, aoi) if aoi is not None else None
+        if region is not None:
+            windows = region.tiles(tile_size, overlap)
+        else:
+            windows = tile_windows(src.width, src.height, tile_size, overlap)
+        interiors = {(int(w.col_off), int(w.row_off)): b for w, b in zip(windows, tile_interiors(windows))}
+
+        coarse = None
+        if coarse_factor and coarse_factor > 1:
+            windows, coarse = coarse_select(src, model, windows, region, tile_size, overlap, coarse_factor, coarse_conf,
+                                            coarse_margin, skip_empty, batch_size, read_queue, gdal_env)
+
+        start = {"type": "Start", "model_classes": model.names, "tiles_total": len(windows)}
+        if coarse is not None:
+            start["coarse"] = coarse
+        yield start
+
+        pending = [] # overlap band candidates whose dedup group may still grow
+        ready = [] # survivors of the per-tile dedup, emitted with the next row
+        totals = {'tiles_inferred': 0, 'tiles_cached': 0, 'candidates': 0, 'band_candidates': 0, 'features': 0}
+
+        def finalize(next_y):
+            with metrics.timer('dedup'):
+                final, pending[:] = split_final(pending, next_y, class_agnostic)
+
+                # --- APPLY DEDUP FILTER (default hybrid: Containment + NMS) ---
+                survivors = ready + filter_candidates(final, dedup_policy, iou_thresh=0.5, class_agnostic=class_agnostic, debug=debug_filter)
+            ready.clear()
+            if not survivors:
+                return
+
+            # Georeference all survivors at once
+            with metrics.timer('projection'):
+                corners = project_bboxes([c['bbox'] for c in survivors], transform, transformer).tolist()
+
+            # Crops for survivors only, encoded in the pool (bounded by encode_queue)
+            for start in range(0, len(survivors), max(1, encode_queue)):
+                chunk = survivors[start:start + max(1, encode_queue)]
+                futures = []
+                for c in chunk:
+                    name = crop_store.reserve() if crop_store is not None else None
+                    with metrics.timer('crop_read'):
+                        crop = read_crop(crop_src, c['bbox'])
+                    futures.append(encoder.submit(metrics.timed('encode', encode_crop), crop, crop_store, name))
+                for i, (c, future) in enumerate(zip(chunk, futures)):
+                    c['crop'] = future.result()
+                    totals['features'] += 1
+                    yield candidate_to_feature(c, corners[start + i])
+
+        def progress():
+            metrics.set(tiles_skipped=tile_stats['tiles_skipped'], **totals)
+            metrics.emit('progress')
+            return {
+                "type": "Progress",
+                "tiles_done": totals['tiles_inferred'] + totals['tiles_cached'] + tile_stats['tiles_skipped'],
+                "tiles_total": len(windows),
+                "features": totals['features'],
             }
+
+        cached, run = {}, None
+        if tile_cache:
+            run = run_key(tif_path, model_path, tile_size, overlap, PREDICT_CONF)
+            if run is not None:
+                cached = load_tiles(run)
+        todo = [w for w in windows if (int(w.col_off), int(w.row_off)) not in cached]
+        if cached:
+            print(f"[TILES] {len(windows) - len(todo)}/{len(windows)} tiles from cache", file=sys.stderr)
+
+        tile_stats = {'tiles_total': 0, 'tiles_skipped': 0}
+        tiles = prefetch(with_gdal_env(metrics.timed_iter('read', read_tiles(src, todo, skip_empty, tile_stats)), gdal_env), read_queue)
+
+        def detections():
+            # (x, y, detections, from_cache) in window order, cached tiles merged in between inferred ones
+            order = iter([(int(w.col_off), int(w.row_off)) for w in windows])
+            for batch in iter_tile_batches(tiles, batch_size, batch_pixels):
+                # Run Inference (one call per batch, results come back in tile order)
+                with metrics.timer('predict'):
+                    batch_results = model.predict([tile[2] for tile in batch], verbose=False, conf=PREDICT_CONF)
+                metrics.count('predict_inputs', len(batch))
+
+                inferred = [(x, y, tile_detections(r.boxes)) for (x, y, img), r in zip(batch, batch_results)]
+                if run is not None:
+                    store_tiles(run, inferred)
+                for x, y, dets in inferred:
+                    for pos in order:
+                        if pos == (x, y):
+                            break
+                        if pos in cached:
+                            yield pos[0], pos[1], cached[pos], True
+                    yield x, y, dets, False
+            for pos in order:
+                if pos in cached:
+                    yield pos[0], pos[1], cached[pos], True
+
+        row_y = None
+        for x, y, dets, from_cache in detections():
+            # New tile row: everything that can no longer grow is emitted
+            if row_y is not None and y != row_y:
+                yield from finalize(y)
+                yield progress()
+            row_y = y
+            totals['tiles_cached' if from_cache else 'tiles_inferred'] += 1
+
+            tile_candidates = []
+            for bx1, by1, bx2, by2, cls, conf in dets.tolist():
+                # Local Coords -> Global Pixel Coords
+                cls = int(cls)
+                label = model.names[cls]
+                gx1 = x + bx1
+                gy1 = y + by1
+                gx2 = x + bx2
+                gy2 = y + by2
+
+                # Edge tiles stick out of the area of interest
+                if region is not None and not region.contains((gx1 + gx2) / 2, (gy1 + gy2) / 2):
+                    continue
+
+                # Store Candidate
+                candidate = {
+                    'bbox': [gx1, gy1, gx2, gy2], # Global Pixel Box
+                    'tile_offset': (x, y),
+                    'cls': cls,
+                    'label': label,
+                    'conf': conf,
+                }
+                tile_candidates.append(candidate)
+                totals['candidates'] += 1
+
+            # Groups clear of the overlap bands are final now, the rest waits for its neighbours
+            with metrics.timer('dedup'):
+                inner, band = split_interior(tile_candidates, interiors[(x, y)], class_agnostic)
+                ready.extend(filter_candidates(inner, dedup_policy, iou_thresh=0.5, class_agnostic=class_agnostic, debug=debug_filter))
+            pending.extend(band)
+            totals['band_candidates'] += len(band)
+
+        yield from finalize(None)
+        yield progress()
+
+        print(f"[DEBUG] Skipped {tile_stats['tiles_skipped']}/{tile_stats['tiles_total']} empty tiles", file=sys.stderr)
+        print(f"[DEBUG] Total candidates before Dedup Filter: {totals['candidates']} ({totals['band_candidates']} in overlap bands)", file=sys.stderr)
+        print(f"[DEBUG] Total candidates after Dedup Filter: {totals['features']}", file=sys.stderr)
+
+        end = {
+            "type": "End",
+            "tiles_total": len(windows),
+            "tiles_skipped": tile_stats['tiles_skipped'],
+            "tiles_cached": totals['tiles_cached'],
+            "candidates": totals['candidates'],
+            "band_candidates": totals['band_candidates'],
+            "features": totals['features'],
         }
-        features.append(feature)
+        if coarse is not None:
+            end["coarse"] = coarse
+        end["metrics"] = metrics.snapshot()
+        metrics.emit('end')
+        yield end
 
-    return {
+def run_inference(tif_path, model_path, emit=None, **opts):
+    """
+    Runs iter_inference and returns the GeoJSON FeatureCollection.
+    With emit, every record is handed to emit(record) as it is produced instead
+    (streaming mode) and the returned collection carries no features.
+    """
+    geojson = {
         "type": "FeatureCollection",
-        "model_classes": model.names,
-        "features": features
+        "model_classes": None,
+        "features": []
     }
+    for record in iter_inference(tif_path, model_path, **opts):
+        if record['type'] == 'Start':
+            geojson['model_classes'] = record['model_classes']
+        if emit is not None:
+            emit(record)
+        elif record['type'] == 'Feature':
+            geojson['features'].append(record)
+
+    # Same order as a single global filter pass (highest confidence first)
+    geojson['features'].sort(key=lambda f: f['properties']['confidence'], reverse=True)
+    return geojson
+
+def _feature_bboxes(features, transform, transformer):
+    # Pixel bboxes of features (lon/lat corners back through transformer, EPSG:4326 ->
+    # raster CRS, and the inverse geotransform), the units touching_pairs expects
+    rings = np.array([f['geometry']['coordinates'][0][:4] for f in features], dtype=np.float64).reshape(-1, 2)
+    xs, ys = transformer.transform(rings[:, 0], rings[:, 1])
+    inv = ~transform
+    xs, ys = np.asarray(xs), np.asarray(ys)
+    cols = (xs * inv.a + ys * inv.b + inv.c).reshape(-1, 4)
+    rows = (xs * inv.d + ys * inv.e + inv.f).reshape(-1, 4)
+    return np.stack([cols.min(axis=1), rows.min(axis=1), cols.max(axis=1), rows.max(axis=1)], axis=1)
+
+def coarse_report(tif_path, model_path, match_iou=0.5, **opts):
+    """
+    Tuning aid for the coarse-to-fine mode: runs the orthophoto once at full resolution
+    and once with opts' coarse settings (coarse_factor, coarse_conf, coarse_margin), and
+    reports the throughput of both and the recall of the coarse run: the share of
+    full-run features it finds too (same label, IoU >= match_iou).
+    """
+    if not opts.get('coarse_factor'):
+        opts['coarse_factor'] = 4
+    runs = {}
+    # Both runs do their own inference (no tile cache) so the timings compare
+    for name, run_opts in (("full", dict(opts, coarse_factor=None, tile_cache=False)), ("coarse", dict(opts, tile_cache=False))):
+        started = time.time()
+        features, end = [], None
+        for record in iter_inference(tif_path, model_path, **run_opts):
+            if record['type'] == 'Feature':
+                features.append(record)
+            elif record['type'] == 'End':
+                end = record
+        runs[name] = (features, end, time.time() - started)
+
+    from pyproj import Transformer
+    with rasterio.Env(**(opts.get('gdal_env') or {})), rasterio.open(tif_path) as src:
+        megapixels = src.width * src.height / 1e6
+        transform = src.transform
+        transformer = Transformer.from_crs("EPSG:4326", src.crs, always_xy=True)
+
+    full, coarse = runs["full"][0], runs["coarse"][0]
+    found = 0
+    if full and coarse:
+        # Candidate matches from the dedup grid index, exact IoU on those pairs only (in pixels:
+        # the grid sizes its cells for pixel or metre boxes, not degrees)
+        boxes = np.concatenate([_feature_bboxes(full, transform, transformer), _feature_bboxes(coarse, transform, transformer)])
+        _, classes = np.unique([f['properties']['label'] for f in full + coarse], return_inverse=True)
+        a, b = touching_pairs(boxes, classes)
+        a, b = np.minimum(a, b), np.maximum(a, b)
+        cross = (a < len(full)) & (b >= len(full))
+        a, b = a[cross], b[cross]
+        inter = np.maximum(0, np.minimum(boxes[a, 2], boxes[b, 2]) - np.maximum(boxes[a, 0], boxes[b, 0])) * \
+                np.maximum(0, np.minimum(boxes[a, 3], boxes[b, 3]) - np.maximum(boxes[a, 1], boxes[b, 1]))
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            iou = np.where(inter > 0, inter / (areas[a] + areas[b] - inter), 0)
+        found = len(np.unique(a[iou >= match_iou]))
+
+    def summary(name):
+        features, end, seconds = runs[name]
+        return {
+            "features": len(features),
+            "tiles_inferred": end['tiles_total'] - end['tiles_skipped'],
+            "seconds": round(seconds, 3),
+            "mp_per_s": round(megapixels / seconds, 2) if seconds else None,
+        }
+
+    report = {
+        "megapixels": round(megapixels, 2),
+        "full": summary("full"),
+        "coarse": dict(summary("coarse"), coarse_pass=runs["coarse"][1].get("coarse")),
+        "recall": round(found / len(full), 4) if full else None,
+    }
+    report["speedup"] = round(runs["full"][2] / runs["coarse"][2], 2) if runs["coarse"][2] else None
+    return report
+
+def run_task(project_id, task_id, model, crop_root=None, chunk_size=None, remote=False, report=False, metrics=None, **inference_opts):
+    """
+    Full detection flow for a WebODM task: fetch the orthophoto (from the local asset
+    cache when this version was downloaded before) and run inference on it.
+    With remote, nothing is downloaded: the orthophoto is read in place over HTTP ranges,
+    which pays off together with an aoi (only the tiles it touches are transferred).
+    Returns the GeoJSON FeatureCollection. inference_opts are passed to run_inference.
+    report=True returns the coarse-to-fine tuning report (coarse_report) instead.
+    With crop_root, crops are stored in crop_root/<task_id>/ and served as /api/crops/<task_id>/...
+    metrics (metrics.Metrics) covers the download and the inference run.
+    """
+    metrics = metrics or Metrics('task')
+    headers = get_auth_headers()
+    print(f"Auth Headers obtained: {bool(headers)}", file=sys.stderr)
+
+    # Determine Download URL (Use /download/ format verified earlier)
+    url = f"{WEBODM_URL}/api/projects/{project_id}/tasks/{task_id}/download/orthophoto.tif"
+    print(f"Fetching: {url}", file=sys.stderr)
+
+    if remote:
+        tif_path = f"/vsicurl/{url}"
+        inference_opts['gdal_env'] = remote_gdal_env(headers)
+    else:
+        fetch_opts = {'chunk_size': chunk_size} if chunk_size else {}
+        tif_path = fetch_asset(url, headers, key=f"{project_id}_{task_id}_orthophoto", metrics=metrics, **fetch_opts)
+        print(f"Orthophoto ready: {tif_path} ({os.path.getsize(tif_path)} bytes)", file=sys.stderr)
+
+    if report:
+        # No crop store: the report's runs must not replace the task's crops
+        inference_opts.pop('emit', None)
+        print(f"Running coarse-to-fine report on {tif_path} with model {model}...", file=sys.stderr)
+        return coarse_report(tif_path, f"yolomodels/{model}", **inference_opts)
+
+    if crop_root:
+        inference_opts['crop_store'] = CropStore(os.path.join(crop_root, str(task_id)), f"/api/crops/{task_id}")
+
+    print(f"Running Inference on {tif_path} with model {model}...", file=sys.stderr)
+    return run_inference(tif_path, f"yolomodels/{model}", metrics=metrics, **inference_opts)
+
+def parse_aoi(value):
+    """
+    --aoi: "min_lon,min_lat,max_lon,max_lat" or a GeoJSON file (geometry, Feature or FeatureCollection).
+    """
+    if os.path.exists(value):
+        with open(value) as f:
+            data = json.load(f)
+        if data.get('type') == 'FeatureCollection':
+            data = data['features'][0]
+        return data.get('geometry', data)
+    return [float(v) for v in value.split(',')]
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--task_id', required=True)
     parser.add_argument('--project_id', required=True)
     parser.add_argument('--model', default='')
+    parser.add_argument('--batch-size', type=int, default=8, help='Tiles per model.predict call')
+    parser.add_argument('--batch-pixels', type=int, default=None, help='Max total tile pixels per batch (optional)')
+    parser.add_argument('--read-queue', type=int, default=4, help='Tiles prefetched ahead of inference')
+    parser.add_argument('--encode-workers', type=int, default=4, help='Threads encoding detection crops')
+    parser.add_argument('--encode-queue', type=int, default=256, help='Max crops encoded at once')
+    parser.add_argument('--debug-filter', action='store_true', help='Log every box removed by the dedup filter')
+    parser.add_argument('--dedup', choices=POLICIES, default='hybrid', help='How overlapping detections are merged')
+    parser.add_argument('--class-agnostic', action=argparse.BooleanOptionalAction, default=False, help='Let detections of different classes suppress each other')
+    parser.add_argument('--no-skip-empty', action='store_true', help='Run inference on tiles outside the orthophoto footprint too')
+    parser.add_argument('--chunk-size', type=int, default=None, help='Download chunk size in bytes (default DOWNLOAD_CHUNK_SIZE)')
+    parser.add_argument('--crop-dir', default=None, help='Write crops to <crop-dir>/<task_id>/ instead of inline base64')
+    parser.add_argument('--remote', action='store_true', help='Read the orthophoto over HTTP range requests instead of downloading it')
+    parser.add_argument('--aoi', type=parse_aoi, default=None, help='Area of interest: min_lon,min_lat,max_lon,max_lat or a GeoJSON file')
+    parser.add_argument('--coarse', type=int, default=None, metavar='FACTOR', help='Coarse-to-fine: find candidate tiles on a 1/FACTOR overview first')
+    parser.add_argument('--coarse-conf', type=float, default=0.1, help='Confidence threshold of the coarse pass')
+    parser.add_argument('--coarse-margin', type=int, default=64, help='Pixels around coarse detections that still select a tile')
+    parser.add_argument('--coarse-report', action='store_true', help='Print a recall / throughput report (full vs coarse-to-fine run) instead of detections')
+    parser.add_argument('--no-tile-cache', action='store_true', help='Run every tile through the model, ignoring (and not filling) the tile result cache')
+    parser.add_argument('--stream', action='store_true', help='Write newline-delimited records (features, progress) as they are ready')
+    parser.add_argument('--metrics', action='store_true', help='Log JSON metrics (counters, stage timings) to stderr with every progress record')
+    parser.add_argument('--profile', default=None, metavar='PATH', help='Run under cProfile and write the stats to PATH')
     args = parser.parse_args()
 
-    # Setup paths
-    temp_tif = f"temp_{args.task_id}.tif"
-
     try:
         print("Starting detect_task.py...", file=sys.stderr)
-        headers = get_auth_headers()
-        print(f"Auth Headers obtained: {bool(headers)}", file=sys.stderr)
 
-        # Determine Download URL (Use /download/ format verified earlier)
-        url = f"{WEBODM_URL}/api/projects/{args.project_id}/tasks/{args.task_id}/download/orthophoto.tif"
-        print(f"Downloading from: {url}", file=sys.stderr)
-        # print(f"TEST", args)
-
-        download_file(url, temp_tif, headers)
-        print(f"Download complete. File size: {os.path.getsize(temp_tif)} bytes", file=sys.stderr)
-
-        print(f"Running Inference on {temp_tif} with model {args.model}...", file=sys.stderr)
-        geojson = run_inference(temp_tif, f"yolomodels/{args.model}")
-
-        print("Inference complete. Dumping JSON...", file=sys.stderr)
-        print(json.dumps(geojson))
+        emit = None
+        if args.stream:
+            def emit(record):
+                sys.stdout.write(json.dumps(record) + "\n")
+                sys.stdout.flush()
+
+        with profiled(args.profile):
+            geojson = run_task(
+                args.project_id, args.task_id, args.model,
+                crop_root=args.crop_dir,
+                chunk_size=args.chunk_size,
+                remote=args.remote,
+                aoi=args.aoi,
+                batch_size=args.batch_size,
+                batch_pixels=args.batch_pixels,
+                read_queue=args.read_queue,
+                encode_workers=args.encode_workers,
+                encode_queue=args.encode_queue,
+                debug_filter=args.debug_filter,
+                dedup_policy=args.dedup,
+                class_agnostic=args.class_agnostic,
+                skip_empty=not args.no_skip_empty,
+                tile_cache=not args.no_tile_cache,
+                coarse_factor=args.coarse,
+                coarse_conf=args.coarse_conf,
+                coarse_margin=args.coarse_margin,
+                report=args.coarse_report,
+                metrics=Metrics('task', log=args.metrics or None),
+                emit=emit,
+            )
+
+        if args.coarse_report:
+            print(json.dumps(geojson, indent=2))
+        elif not args.stream:
+            print("Inference complete. Dumping JSON...", file=sys.stderr)
+            print(json.dumps(geojson))
 
     except Exception as e:
         print(f"CRITICAL PYTHON ERROR: {e}", file=sys.stderr)
         # print(json.dumps({"error": str(e)})) # Don't mix stdout with error if possible
         sys.exit(1)
-    finally:
-        if os.path.exists(temp_tif):
-            os.remove(temp_tif)
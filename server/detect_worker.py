@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import traceback
+
+# detect_task strips --dev from argv and loads .env on import, so import it first
+import detect_task
+import detect_raw
+from model_cache import get_model, clear_models
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tools'))
+import analyze
+
+# Long-lived detection service.
+# Protocol: one JSON request per line on stdin, one JSON response per line on stdout.
+#   -> {"id": 1, "method": "run_task", "params": {"project_id": 3, "task_id": "...", "model": "x.pt"}}
+#   <- {"id": 1, "result": {...}}  or  {"id": 1, "error": "..."}
+# With "stream": true in params (run_task / run_inference), records are sent as they are
+# produced, {"id": 1, "record": {...}}, before the final result.
+# Models stay loaded between requests (see model_cache), so only the first job pays the startup.
+
+def _preload(model_path):
+    get_model(model_path)
+    return {"loaded": model_path}
+
+def _clear():
+    clear_models()
+    return {"cleared": True}
+
+METHODS = {
+    "run_task": detect_task.run_task,
+    "run_inference": detect_task.run_inference,
+    "run_detection_raw": detect_raw.run_detection_raw,
+    "analyze": analyze.analyze_dir,
+    "preload": _preload,
+    "clear_models": _clear,
+    "ping": lambda: "pong",
+}
+
+def handle(request, send):
+    method = METHODS.get(request.get("method"))
+    if method is None:
+        raise ValueError(f"Unknown method: {request.get('method')}")
+
+    params = dict(request.get("params") or {})
+    if params.pop("stream", False):
+        params["emit"] = lambda record: send({"id": request.get("id"), "record": record})
+    return method(**params)
+
+def main():
+    # Anything the detection code prints must not end up in the protocol stream
+    out = sys.stdout
+    sys.stdout = sys.stderr
+
+    def send(message):
+        out.write(json.dumps(message) + "\n")
+        out.flush()
+
+    print("[WORKER] Ready", file=sys.stderr)
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        req_id = None
+        try:
+            request = json.loads(line)
+            req_id = request.get("id")
+            response = {"id": req_id, "result": handle(request, send)}
+        except Exception as e:
+            traceback.print_exc(file=sys.stderr)
+            response = {"id": req_id, "error": str(e)}
+
+        send(response)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import os
+import sys
+import json
+import struct
+import sqlite3
+import threading
+import exifread
+
+# Parsed EXIF of drone frames, cached on disk so re-running tools over the same
+# flight folder does not re-parse every file. Entries are keyed by path and are
+# only reused while the file size and mtime are unchanged.
+CACHE_PATH = os.getenv('EXIF_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'exif.sqlite'))
+
+# Bump when the fields returned by read_exif change, so old entries get re-parsed
+SCHEMA_VERSION = 2
+
+# Entries kept, the oldest written are dropped first (uploads analyzed from temporary
+# folders leave entries for files that are gone right after)
+CACHE_MAX_ENTRIES = int(os.getenv('EXIF_CACHE_MAX_ENTRIES', '200000'))
+PRUNE_EVERY = 1000
+
+_conn = None
+_lock = threading.Lock()
+_writes = 0
+
+def _ratio(tags, tag):
+    if tag in tags:
+        val = tags[tag].values
+        if isinstance(val, list):
+            if not val:
+                return None
+            val = val[0]
+        if isinstance(val, (int, float)):
+            return float(val)
+        if hasattr(val, 'num') and hasattr(val, 'den') and val.den != 0:
+            return float(val.num) / float(val.den)
+    return None
+
+def _int(tags, tag):
+    if tag in tags:
+        val = tags[tag].values
+        if isinstance(val, list):
+            val = val[0] if val else None
+        if isinstance(val, int):
+            return val
+    return None
+
+def _dms(tags, tag):
+    if tag not in tags:
+        return None
+    values = tags[tag].values
+    d, m, s = (float(v.num) / float(v.den) for v in values[:3])
+    return d + (m / 60.0) + (s / 3600.0)
+
+def read_exif(image_path):
+    """
+    Parses the GPS / EXIF tags we use from image_path (no cache).
+    Missing values are None, callers apply their own defaults.
+    details=False skips maker notes and the thumbnail, the expensive part of a parse.
+    """
+    with open(image_path, 'rb') as f:
+        tags = exifread.process_file(f, details=False)
+
+    lat = _dms(tags, 'GPS GPSLatitude')
+    if lat is not None and 'GPS GPSLatitudeRef' in tags and tags['GPS GPSLatitudeRef'].values == 'S':
+        lat = -lat
+    lon = _dms(tags, 'GPS GPSLongitude')
+    if lon is not None and 'GPS GPSLongitudeRef' in tags and tags['GPS GPSLongitudeRef'].values == 'W':
+        lon = -lon
+
+    return {
+        'lat': lat,
+        'lon': lon,
+        'alt': _ratio(tags, 'GPS GPSAltitude'),
+        'yaw': _ratio(tags, 'GPS GPSImgDirection'),
+        'focal': _ratio(tags, 'EXIF FocalLength'),
+        # PixelXDimension / PixelYDimension (may be missing or stale after edits)
+        'width': _int(tags, 'EXIF ExifImageWidth'),
+        'height': _int(tags, 'EXIF ExifImageLength'),
+        'orientation': _int(tags, 'Image Orientation'),
+    }
+
+def _connect():
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        # Shared across the loader threads, access is serialized by _lock
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute('PRAGMA journal_mode=WAL')
+        _conn.execute('PRAGMA synchronous=NORMAL')
+        _conn.execute(
+            'CREATE TABLE IF NOT EXISTS exif ('
+            'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, version INTEGER, data TEXT)'
+        )
+        _prune(_conn)
+    return _conn
+
+def _prune(conn):
+    # rowids grow with every write (a replaced entry gets a new one), so the oldest
+    # entries are the ones more than CACHE_MAX_ENTRIES below the newest
+    conn.execute('DELETE FROM exif WHERE rowid <= (SELECT MAX(rowid) FROM exif) - ?', (max(1, CACHE_MAX_ENTRIES),))
+    conn.commit()
+
+def get_image_meta(image_path, use_cache=True):
+    """
+    read_exif(image_path), served from the SQLite cache when the file is unchanged.
+    The cache keeps the last CACHE_MAX_ENTRIES files parsed.
+    If the cache can't be used (e.g. read-only disk) the file is just parsed.
+    """
+    if not use_cache:
+        return read_exif(image_path)
+
+    path = os.path.abspath(image_path)
+    st = os.stat(path)
+    try:
+        with _lock:
+            row = _connect().execute(
+                'SELECT data FROM exif WHERE path = ? AND size = ? AND mtime_ns = ? AND version = ?',
+                (path, st.st_size, st.st_mtime_ns, SCHEMA_VERSION)
+            ).fetchone()
+        if row is not None:
+            return json.loads(row[0])
+    except sqlite3.Error as e:
+        print(f"[EXIF] Cache unavailable: {e}", file=sys.stderr)
+        return read_exif(path)
+
+    global _writes
+    meta = read_exif(path)
+    try:
+        with _lock:
+            conn = _connect()
+            conn.execute(
+                'INSERT OR REPLACE INTO exif (path, size, mtime_ns, version, data) VALUES (?, ?, ?, ?, ?)',
+                (path, st.st_size, st.st_mtime_ns, SCHEMA_VERSION, json.dumps(meta))
+            )
+            conn.commit()
+            _writes += 1
+            if _writes % PRUNE_EVERY == 0:
+                _prune(conn)
+    except sqlite3.Error as e:
+        print(f"[EXIF] Cache write failed: {e}", file=sys.stderr)
+    return meta
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, ...), they carry the frame size
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def _jpeg_size(f):
+    # Walks the segment headers up to the SOF marker, skipping segment bodies with seek
+    if f.read(2) != b'\xff\xd8':
+        return None
+    while True:
+        b = f.read(1)
+        while b and b != b'\xff':
+            b = f.read(1)
+        while b == b'\xff':
+            b = f.read(1) # fill bytes
+        if not b:
+            return None
+        marker = b[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            continue # no length field
+        if marker in (0xD9, 0xDA):
+            return None # end of image / scan data before any frame header
+        length = struct.unpack('>H', f.read(2))[0]
+        if marker in _JPEG_SOF:
+            _, height, width = struct.unpack('>BHH', f.read(5))
+            return width, height
+        f.seek(length - 2, 1)
+
+def _png_size(f):
+    head = f.read(24)
+    if len(head) < 24 or head[:8] != b'\x89PNG\r\n\x1a\n' or head[12:16] != b'IHDR':
+        return None
+    return struct.unpack('>II', head[16:24])
+
+def image_size(image_path, meta=None):
+    """
+    (width, height) of an image as cv2.imread would return it, without decoding the pixels:
+    from the JPEG frame header / PNG IHDR, else from the EXIF PixelX/YDimension (meta, see
+    get_image_meta), else by decoding. Returns None if the image can't be read at all.
+    """
+    size = None
+    is_jpeg = False
+    try:
+        with open(image_path, 'rb') as f:
+            size = _jpeg_size(f)
+            is_jpeg = size is not None
+            if size is None:
+                f.seek(0)
+                size = _png_size(f)
+    except (OSError, struct.error):
+        size = None
+
+    if size is None and meta and meta.get('width') and meta.get('height'):
+        size = (meta['width'], meta['height'])
+        is_jpeg = True
+
+    if size is None:
+        import cv2
+        img = cv2.imread(image_path)
+        if img is None:
+            return None
+        return img.shape[1], img.shape[0]
+
+    # cv2.imread applies the EXIF orientation of JPEGs: 90 degree rotations swap the axes
+    if is_jpeg and meta and meta.get('orientation') in (5, 6, 7, 8):
+        size = (size[1], size[0])
+    return size
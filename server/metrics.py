@@ -0,0 +1,127 @@
+import os
+import sys
+import json
+import time
+import bisect
+import cProfile
+import threading
+from contextlib import contextmanager
+
+# Counters and timers of a detection run (download, tile reads, predict latency, dedup,
+# crop encoding, ...). A snapshot goes into the End record of every run; with
+# DETECT_METRICS=1 (or --metrics) snapshots are also written to stderr as JSON lines,
+# {"type": "Metrics", "event": "progress" | "end", ...}, next to the usual log output.
+METRICS_LOG = os.getenv('DETECT_METRICS', '').lower() in ('1', 'true', 'yes')
+
+# Upper bounds (ms) of the latency histogram buckets, the last bucket is open ended
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class Metrics:
+    """
+    Thread safe counters and latency timers (count, total, max, histogram) of one run.
+    Timers are fed from worker threads too (reader, encoder pool), so their totals can
+    exceed the wall time.
+    """
+    def __init__(self, name, log=None):
+        self.name = name
+        self.log = METRICS_LOG if log is None else log
+        self.started = time.perf_counter()
+        self.counters = {}
+        self.timers = {}
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set(self, **values):
+        with self._lock:
+            self.counters.update(values)
+
+    def observe(self, name, seconds):
+        with self._lock:
+            t = self.timers.get(name)
+            if t is None:
+                t = self.timers[name] = {'count': 0, 'total': 0.0, 'max': 0.0, 'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+            t['count'] += 1
+            t['total'] += seconds
+            t['max'] = max(t['max'], seconds)
+            t['buckets'][bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)] += 1
+
+    @contextmanager
+    def timer(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0)
+
+    def timed(self, name, fn):
+        # fn wrapped to feed timer name, e.g. for tasks submitted to a pool
+        def wrapper(*args, **kwargs):
+            with self.timer(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def timed_iter(self, name, items):
+        # Time spent producing each item of items (e.g. raster reads in the prefetch thread)
+        it = iter(items)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            self.observe(name, time.perf_counter() - t0)
+            yield item
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self.started
+        # Histograms list the non-empty buckets only, keyed by their upper bound in ms
+        bounds = [str(b) for b in LATENCY_BUCKETS_MS] + ['inf']
+        with self._lock:
+            counters = dict(self.counters)
+            timers = {}
+            for name, t in self.timers.items():
+                histogram = {b: n for b, n in zip(bounds, t['buckets']) if n}
+                timers[name] = {
+                    "count": t['count'],
+                    "total_s": round(t['total'], 4),
+                    "mean_ms": round(t['total'] * 1000 / t['count'], 3),
+                    "max_ms": round(t['max'] * 1000, 3),
+                    "histogram_ms": histogram,
+                }
+
+        rates = {}
+        if counters.get('download_bytes') and timers.get('download', {}).get('total_s'):
+            rates['download_bytes_per_s'] = round(counters['download_bytes'] / timers['download']['total_s'], 1)
+        for name in ('tiles_inferred', 'images_done', 'features'):
+            if name in counters and elapsed > 0:
+                rates[f"{name}_per_s"] = round(counters[name] / elapsed, 3)
+
+        return {"elapsed_s": round(elapsed, 3), "counters": counters, "timers": timers, "rates": rates}
+
+    def emit(self, event):
+        if self.log:
+            record = {"type": "Metrics", "run": self.name, "event": event}
+            record.update(self.snapshot())
+            print(json.dumps(record), file=sys.stderr, flush=True)
+
+@contextmanager
+def profiled(path):
+    """
+    Runs the block under cProfile and writes the stats to path (pstats format, e.g. for
+    snakeviz or python -m pstats). No-op when path is None. For sampling profilers
+    (py-spy) the pipeline threads are named (tile-reader, crop-encoder, frame-loader).
+    """
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+        print(f"[PROFILE] Stats written to {path}", file=sys.stderr)
@@ -0,0 +1,50 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# How many YOLO models stay resident at once (each large model is a few hundred MB)
+MODEL_CACHE_SIZE = int(os.getenv('MODEL_CACHE_SIZE', '2'))
+
+_models = OrderedDict()
+_lock = threading.Lock()
+
+def _model_key(model_path):
+    # mtime is part of the key so retrained weights dropped over the old file get reloaded.
+    # Names like 'yolo11n.pt' that ultralytics downloads itself have no local file yet.
+    path = os.path.abspath(model_path)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        mtime = None
+    return (path, mtime)
+
+def get_model(model_path):
+    """
+    Returns a loaded YOLO model for model_path, reusing an already loaded
+    instance when the weights file has not changed (LRU, MODEL_CACHE_SIZE entries).
+    """
+    key = _model_key(model_path)
+    with _lock:
+        model = _models.get(key)
+        if model is not None:
+            _models.move_to_end(key)
+            return model
+
+        # Drop stale entries for the same file (older mtime)
+        for stale in [k for k in _models if k[0] == key[0]]:
+            del _models[stale]
+
+        from ultralytics import YOLO
+        print(f"[MODEL] Loading {model_path}", file=sys.stderr)
+        model = YOLO(model_path)
+        _models[key] = model
+
+        while len(_models) > max(1, MODEL_CACHE_SIZE):
+            evicted, _ = _models.popitem(last=False)
+            print(f"[MODEL] Evicting {evicted[0]}", file=sys.stderr)
+        return model
+
+def clear_models():
+    with _lock:
+        _models.clear()
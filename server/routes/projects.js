@@ -302,8 +302,7 @@ router.get("/:id/model", async (req, res) => {
 	}
 });
 
-import { spawn } from "child_process";
-import {randomUUID} from "crypto";
+import detectWorker, { requestSignal } from "../services/detectWorker";
 
 // POST /api/projects/:id/detect - Run Object Detection
 router.post("/:id/detect", async (req, res) => {
@@ -313,57 +312,46 @@ router.post("/:id/detect", async (req, res) => {
 
 		console.log(`[DEBUG] Starting Raw Detection for ${project.name} on ${project.images.length} images`);
 
-		// execute detect_task.py (Strategy A - Stitched Orthophoto)
-		// Detects on the map file directly.
-		// console.log("TEST", project)
-
-		const pythonProcess = spawn(
-			"python",
-			[
-				"detect_task.py",
-				"--task_id",
-				project.odmTaskId,
-				"--project_id",
-				project.odmProjectId,
-				"--model",
-				req.body.model ?? path.resolve(process.cwd(), "yolomodels/yolo11l_Best.pt"),
-				process.argv.includes("--dev") ? "--dev" : "",
-			].filter((arg) => arg !== ""),
-			{
-				cwd: process.cwd(), // Run in 'server' folder
-			},
-		);
-
-		let stdoutData = "";
-		let stderrData = "";
-
-		pythonProcess.stdout.on("data", (data) => {
-			stdoutData += data.toString();
-		});
-
-		pythonProcess.stderr.on("data", (data) => {
-			stderrData += data.toString();
-			console.error("[PYTHON ERR]", data.toString());
-		});
-
-		pythonProcess.on("close", (code) => {
-			if (code !== 0) {
-				console.error("[DETECT FAIL]", stderrData);
-				return res.status(500).json({ error: "Detection failed", details: stderrData });
-			}
+		// detect_task.run_task (Strategy A - Stitched Orthophoto)
+		// Detects on the map file directly. Runs in the persistent python worker so the
+		// model is only loaded once across requests.
+		const params = {
+			project_id: project.odmProjectId,
+			task_id: project.odmTaskId,
+			model: req.body.model ?? path.resolve(process.cwd(), "yolomodels/yolo11l_Best.pt"),
+			// Crops are written to crops/<task_id>/ and referenced by URL (served under /api/crops)
+			crop_root: "crops",
+		};
+		// Optional area of interest ([minLon, minLat, maxLon, maxLat] or a GeoJSON geometry), and
+		// remote: read the orthophoto over HTTP ranges instead of downloading all of it
+		if (req.body.aoi) params.aoi = req.body.aoi;
+		if (req.body.remote) params.remote = true;
+		// The run is cancelled (queued or running) if the client disconnects first
+		const signal = requestSignal(res);
+
+		// Streaming: newline-delimited records (Start, Feature..., Progress, End) as they are ready
+		if (req.body.stream) {
+			res.setHeader("Content-Type", "application/x-ndjson");
 			try {
-				// Find JSON start/end if there's noise
-				const jsonStr = stdoutData.trim();
-				// Simple cleanup if mixed output
-				const lastLine = jsonStr.split("\n").pop();
-				const jsonResult = JSON.parse(lastLine);
-				res.json(jsonResult);
-			} catch (e) {
-				console.error("JSON Parse Error:", e);
-				console.log("Raw Output:", stdoutData);
-				res.status(500).json({ error: "Invalid output from detection script", raw: stdoutData });
+				await detectWorker.call("run_task", { ...params, stream: true }, (record) => {
+					res.write(JSON.stringify(record) + "\n");
+				}, signal);
+			} catch (err) {
+				if (signal.aborted) return;
+				console.error("[DETECT FAIL]", err.message);
+				res.write(JSON.stringify({ type: "Error", error: err.message }) + "\n");
 			}
-		});
+			return res.end();
+		}
+
+		try {
+			const jsonResult = await detectWorker.call("run_task", params, null, signal);
+			res.json(jsonResult);
+		} catch (err) {
+			if (signal.aborted) return;
+			console.error("[DETECT FAIL]", err.message);
+			res.status(500).json({ error: "Detection failed", details: err.message });
+		}
 	} catch (e) {
 		console.error(e);
 		res.status(500).json({ error: e.message });
@@ -4,6 +4,7 @@ import { spawn } from "child_process";
 import path from "path";
 import fs from "fs-extra";
 import multer from "multer";
+import { toolsWorker, requestSignal } from "../services/detectWorker";
 
 // Configure Multer for temp storage
 const tempDir = path.join(process.cwd(), "temp_tools");
@@ -181,28 +182,21 @@ router.post("/analyze", upload.array("images"), (req, res) => {
 		});
 	};
 
-	const py = spawn("python", [path.join(TOOLS_DIR, "analyze.py"), "--dir", batchDir, "--model", modelArg]);
-
-	let stdoutData = "";
-	let stderrData = "";
-
-	py.stdout.on("data", (data) => (stdoutData += data.toString()));
-	py.stderr.on("data", (data) => (stderrData += data.toString()));
-
-	py.on("close", (code) => {
-		cleanup();
-		if (code !== 0) {
-			console.error(`Error running analyze.py:`, stderrData);
-			return res.status(500).json({ error: "Analysis failed", details: stderrData });
-		}
-		try {
-			const json = JSON.parse(stdoutData.trim());
+	// Runs in the persistent tools worker (model stays loaded between batches), not behind
+	// orthophoto detection runs. Cancelled if the client disconnects first.
+	const signal = requestSignal(res);
+	toolsWorker
+		.call("analyze", { image_dir: batchDir, model_path: modelArg }, null, signal)
+		.then((json) => {
+			cleanup();
 			res.json(json);
-		} catch (e) {
-			console.error("JSON Parse Error:", e);
-			res.status(500).json({ error: "Invalid output", raw: stdoutData });
-		}
-	});
+		})
+		.catch((err) => {
+			cleanup();
+			if (signal.aborted) return;
+			console.error(`Error running analyze:`, err.message);
+			res.status(500).json({ error: "Analysis failed", details: err.message });
+		});
 });
 
 export default router;
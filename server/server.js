@@ -20,6 +20,8 @@ console.log("----------------------------");
 // Middleware
 app.use(cors());
 app.use("/uploads", express.static(path.join(__dirname, "uploads")));
+// Detection crops written by detect_task.py (features reference them via properties.image_url)
+app.use("/api/crops", express.static(path.join(process.cwd(), "crops")));
 // app.use(express.text());
 app.use(express.json());
 
@@ -0,0 +1,146 @@
+import { spawn } from "child_process";
+import path from "path";
+import readline from "readline";
+
+// Client for the long-lived python detection service (detect_worker.py).
+// Keeps one python process alive so models stay loaded between detection runs.
+// Requests/responses are newline-delimited JSON matched by id.
+//
+// Each worker runs one job at a time, the others wait in a queue here. Orthophoto
+// runs (default export) and the tools (toolsWorker, e.g. analyze) use separate
+// processes, so an upload doesn't wait behind a multi-minute detection run; each
+// process keeps its own loaded models.
+
+const createWorker = (name) => {
+	let worker = null;
+	let nextId = 1;
+	let current = null; // job sent to the worker, not answered yet
+	const queue = [];
+
+	const finish = (job, err, result) => {
+		if (job.signal) job.signal.removeEventListener("abort", job.onAbort);
+		if (err) job.reject(err);
+		else job.resolve(result);
+	};
+
+	const rejectAll = (err) => {
+		if (current) finish(current, err);
+		current = null;
+		for (const job of queue.splice(0)) finish(job, err);
+	};
+
+	const handleLine = (line) => {
+		if (!line.trim()) return;
+		let msg;
+		try {
+			msg = JSON.parse(line);
+		} catch (e) {
+			console.error(`[WORKER ${name}] Invalid output:`, line);
+			return;
+		}
+		if (!current || msg.id !== current.id) return;
+		if (msg.record !== undefined) {
+			// Streamed record, the final result comes later
+			if (current.onRecord) current.onRecord(msg.record);
+			return;
+		}
+		const job = current;
+		current = null;
+		if (msg.error) finish(job, new Error(msg.error));
+		else finish(job, null, msg.result);
+		dispatch();
+	};
+
+	const start = () => {
+		const args = [path.join(process.cwd(), "detect_worker.py")];
+		if (process.argv.includes("--dev")) args.push("--dev");
+
+		const proc = spawn("python", args, { cwd: process.cwd() });
+		worker = proc;
+
+		// readline only scans each new chunk for the line break, so a single large
+		// result line (a non-streamed run_task) is framed in linear time
+		readline.createInterface({ input: proc.stdout, crlfDelay: Infinity }).on("line", handleLine);
+
+		proc.stderr.on("data", (data) => {
+			console.error("[PYTHON ERR]", data.toString());
+		});
+
+		proc.on("close", (code) => {
+			if (worker !== proc) return;
+			console.error(`[WORKER ${name}] Exited with code ${code}`);
+			worker = null;
+			if (current && current.cancelled) {
+				// Killed to cancel the running job: the queued jobs go to a fresh worker
+				finish(current, new Error("Cancelled"));
+				current = null;
+				dispatch();
+			} else {
+				rejectAll(new Error(`Detection worker exited (code ${code})`));
+			}
+		});
+
+		proc.on("error", (err) => {
+			if (worker !== proc) return;
+			console.error(`[WORKER ${name}] Failed to start:`, err.message);
+			worker = null;
+			rejectAll(err);
+		});
+	};
+
+	const dispatch = () => {
+		if (current || queue.length === 0) return;
+		if (!worker) start();
+		current = queue.shift();
+		worker.stdin.write(JSON.stringify({ id: current.id, method: current.method, params: current.params }) + "\n");
+	};
+
+	const cancel = (job) => {
+		const idx = queue.indexOf(job);
+		if (idx !== -1) {
+			queue.splice(idx, 1);
+			finish(job, new Error("Cancelled"));
+		} else if (job === current && worker) {
+			// A running job can't be interrupted inside python: restart the worker
+			console.error(`[WORKER ${name}] Cancelling job ${job.id} (${job.method}), restarting worker`);
+			job.cancelled = true;
+			worker.kill();
+		}
+	};
+
+	// Jobs are executed one at a time, in the order they were called.
+	// onRecord (optional) receives streamed records when params.stream is set.
+	// signal (optional AbortSignal) cancels the job, e.g. when the client disconnects:
+	// a queued job is dropped, a running one stops with its worker process.
+	const call = (method, params = {}, onRecord = null, signal = null) => {
+		return new Promise((resolve, reject) => {
+			if (signal && signal.aborted) return reject(new Error("Cancelled"));
+			const job = { id: nextId++, method, params, onRecord, signal, resolve, reject };
+			if (signal) {
+				job.onAbort = () => cancel(job);
+				signal.addEventListener("abort", job.onAbort);
+			}
+			queue.push(job);
+			dispatch();
+		});
+	};
+
+	const stop = () => {
+		if (worker) worker.kill();
+	};
+
+	return { call, stop };
+};
+
+// AbortSignal that fires when the client goes away before the response is complete
+export const requestSignal = (res) => {
+	const controller = new AbortController();
+	res.on("close", () => {
+		if (!res.writableEnded) controller.abort();
+	});
+	return controller.signal;
+};
+
+export const toolsWorker = createWorker("tools");
+
+export default createWorker("detect");
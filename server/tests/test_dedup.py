@@ -0,0 +1,121 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import dedup
+from dedup import dedup_boxes, filter_candidates
+
+def compute_iou(boxA, boxB):
+    xA = max(boxA[0], boxB[0])
+    yA = max(boxA[1], boxB[1])
+    xB = min(boxA[2], boxB[2])
+    yB = min(boxA[3], boxB[3])
+    interArea = max(0, xB - xA) * max(0, yB - yA)
+    if interArea == 0:
+        return 0
+    boxAArea = (boxA[2] - boxA[0]) * (boxA[3] - boxA[1])
+    boxBArea = (boxB[2] - boxB[0]) * (boxB[3] - boxB[1])
+    return interArea / float(boxAArea + boxBArea - interArea)
+
+def reference_hybrid(candidates, iou_thresh=0.5):
+    # The pairwise loop the vectorized hybrid filter replaced (orthophoto path)
+    candidates = sorted(candidates, key=lambda x: x['conf'], reverse=True)
+    n = len(candidates)
+    keep = [True] * n
+    for i in range(n):
+        if not keep[i]:
+            continue
+        boxA = candidates[i]['bbox']
+        for j in range(i + 1, n):
+            if not keep[j]:
+                continue
+            if candidates[i]['cls'] != candidates[j]['cls']:
+                continue
+            boxB = candidates[j]['bbox']
+            b_in_a = (boxB[0] >= boxA[0] and boxB[1] >= boxA[1] and boxB[2] <= boxA[2] and boxB[3] <= boxA[3])
+            a_in_b = (boxA[0] >= boxB[0] and boxA[1] >= boxB[1] and boxA[2] <= boxB[2] and boxA[3] <= boxB[3])
+            if b_in_a:
+                keep[j] = False
+                continue
+            if a_in_b:
+                keep[i] = False
+                break
+            if compute_iou(boxA, boxB) > iou_thresh:
+                keep[j] = False
+    return [candidates[i] for i in range(n) if keep[i]]
+
+def reference_containment(boxes):
+    # The nested loop the containment policy replaced (raw frame path): a box inside any
+    # other box is dropped, of identical boxes the first one is kept
+    keep = []
+    for i, (ax1, ay1, ax2, ay2) in enumerate(boxes):
+        inside = False
+        for j, (bx1, by1, bx2, by2) in enumerate(boxes):
+            if i == j:
+                continue
+            if ax1 >= bx1 and ay1 >= by1 and ax2 <= bx2 and ay2 <= by2:
+                if (ax1, ay1, ax2, ay2) != (bx1, by1, bx2, by2) or i > j:
+                    inside = True
+                    break
+        keep.append(not inside)
+    return keep
+
+def random_boxes(rng, n, extent=400):
+    """
+    Integer boxes (so edges and boxes coincide), with nested boxes and exact duplicates.
+    """
+    xy = rng.integers(0, extent, (n, 2))
+    wh = rng.integers(8, 80, (n, 2))
+    boxes = np.concatenate([xy, xy + wh], axis=1).astype(np.float64)
+    for i in range(1, n):
+        r = rng.random()
+        if r < 0.15:
+            boxes[i] = boxes[rng.integers(0, i)] # duplicate
+        elif r < 0.35:
+            # nested in (or sharing edges with) an earlier box
+            boxes[i] = boxes[rng.integers(0, i)] + rng.integers(0, 4, 4) * np.array([1, 1, -1, -1])
+    return boxes
+
+def random_scores(rng, n):
+    # Coarse steps so equal confidences (stable order) come up too
+    return np.round(rng.uniform(0.25, 1.0, n), 1)
+
+@pytest.fixture(params=[dedup.FILTER_BLOCK_ELEMENTS, 7], ids=['default-block', 'tiny-block'])
+def block_elements(request, monkeypatch):
+    monkeypatch.setattr(dedup, 'FILTER_BLOCK_ELEMENTS', request.param)
+    return request.param
+
+def test_hybrid_matches_pairwise_loop(block_elements):
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        n = int(rng.integers(1, 60))
+        boxes, scores = random_boxes(rng, n), random_scores(rng, n)
+        classes = rng.integers(0, 3, n)
+        candidates = [{'bbox': b.tolist(), 'conf': float(s), 'cls': int(c), 'id': i}
+                      for i, (b, s, c) in enumerate(zip(boxes, scores, classes))]
+        expected = [c['id'] for c in reference_hybrid(candidates)]
+        assert [c['id'] for c in filter_candidates(candidates, 'hybrid')] == expected
+
+def test_containment_matches_nested_loop(block_elements):
+    rng = np.random.default_rng(1)
+    for _ in range(300):
+        n = int(rng.integers(1, 60))
+        boxes = random_boxes(rng, n)
+        # Model output order, highest confidence first
+        scores = np.sort(random_scores(rng, n))[::-1]
+        keep = dedup_boxes(boxes, scores, policy='containment', class_agnostic=True)
+        assert keep.tolist() == reference_containment(boxes.tolist())
+
+def test_duplicates_keep_highest_confidence():
+    boxes = np.array([[0, 0, 10, 10]] * 3, dtype=np.float64)
+    scores = np.array([0.4, 0.9, 0.6])
+    for policy in dedup.POLICIES:
+        assert dedup_boxes(boxes, scores, policy=policy).tolist() == [False, True, False]
+
+def test_classes_kept_apart_unless_agnostic():
+    boxes = np.array([[0, 0, 10, 10], [2, 2, 8, 8]], dtype=np.float64)
+    scores, classes = np.array([0.9, 0.8]), np.array([0, 1])
+    assert dedup_boxes(boxes, scores, classes).tolist() == [True, True]
+    assert dedup_boxes(boxes, scores, classes, class_agnostic=True).tolist() == [True, False]
@@ -0,0 +1,55 @@
+import os
+import sys
+import math
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from detect_raw import merge_detections, METERS_PER_DEG
+
+LAT, LON = 18.52, 73.85
+
+def feature(east_m, north_m, source, conf=0.8, label='car'):
+    lat = LAT + north_m / METERS_PER_DEG
+    lon = LON + east_m / (METERS_PER_DEG * math.cos(math.radians(LAT)))
+    return {
+        "type": "Feature",
+        "properties": {"label": label, "confidence": conf, "source": source},
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+    }
+
+def test_adjacent_objects_of_one_frame_stay_apart():
+    # A row of parked cars, 2.5 m apart and 4.5 m long, all in one frame
+    features = [feature(2.5 * i, 0.0, 'f1.jpg') for i in range(10)]
+    merged = merge_detections(features, [4.5] * 10)
+    assert len(merged) == 10
+    assert all(f['properties']['detections'] == 1 for f in merged)
+
+def test_adjacent_objects_seen_in_two_frames():
+    # Same row seen again from a second frame, shifted 0.3 m by GPS error
+    features = [feature(2.5 * i, 0.0, 'f1.jpg', conf=0.9) for i in range(10)] + \
+               [feature(2.5 * i + 0.3, 0.0, 'f2.jpg', conf=0.7) for i in range(10)]
+    merged = merge_detections(features, [4.5] * 20)
+    assert len(merged) == 10
+    for f in merged:
+        assert f['properties']['detections'] == 2
+        assert f['properties']['sources'] == ['f1.jpg', 'f2.jpg']
+
+def test_no_chaining_across_frames():
+    # Each frame's detection is within the merge radius of the next, the ends are 7.2 m apart
+    features = [feature(1.8 * i, 0.0, f'f{i}.jpg', conf=0.9 - 0.1 * i) for i in range(5)]
+    merged = merge_detections(features, [1.0] * 5)
+    assert len(merged) > 1
+    assert sum(f['properties']['detections'] for f in merged) == 5
+
+def test_same_object_over_frames_merges():
+    features = [feature(0.1 * i, -0.1 * i, f'f{i}.jpg', conf=0.5 + 0.1 * i) for i in range(4)] + \
+               [feature(50.0, 0.0, 'f0.jpg')]
+    merged = merge_detections(features, [3.0] * 5)
+    assert len(merged) == 2
+    obj = merged[0]['properties']
+    assert obj['detections'] == 4
+    assert math.isclose(obj['confidence'], 0.8)
+    assert obj['source'] == 'f3.jpg'
+
+def test_labels_merge_separately():
+    features = [feature(0.0, 0.0, 'f1.jpg', label='car'), feature(0.2, 0.0, 'f2.jpg', label='truck')]
+    assert len(merge_detections(features, [4.0, 4.0])) == 2
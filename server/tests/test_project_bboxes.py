@@ -0,0 +1,42 @@
+import os
+import sys
+import numpy as np
+import rasterio
+from pyproj import Transformer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from detect_task import project_bboxes
+
+def project_corners(bbox, transform, transformer):
+    # Per-corner path project_bboxes replaced: Affine * (col, row), then one pyproj call per corner
+    x1, y1, x2, y2 = bbox
+    corners = []
+    for col, row in ((x1, y1), (x2, y1), (x2, y2), (x1, y2)):
+        x, y = transform * (col, row)
+        corners.append(transformer.transform(x, y))
+    return corners
+
+def check(transform, crs, n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, 20000, (n, 2))
+    wh = rng.uniform(1, 300, (n, 2))
+    bboxes = np.concatenate([xy, xy + wh], axis=1)
+    transformer = Transformer.from_crs(crs, 'EPSG:4326', always_xy=True)
+
+    corners = project_bboxes(bboxes, transform, transformer)
+    expected = np.array([project_corners(b, transform, transformer) for b in bboxes.tolist()])
+    assert corners.shape == (n, 4, 2)
+    np.testing.assert_allclose(corners, expected, rtol=0, atol=1e-9)
+
+def test_north_up_utm():
+    check(rasterio.Affine(0.05, 0, 375000.0, 0, -0.05, 2048000.0), 'EPSG:32643')
+
+def test_rotated_transform():
+    rotated = rasterio.Affine(0.05, 0, 375000.0, 0, -0.05, 2048000.0) * rasterio.Affine.rotation(12.5)
+    check(rotated, 'EPSG:32643', seed=1)
+
+def test_single_box():
+    transform = rasterio.Affine(0.1, 0, 500000.0, 0, -0.1, 5000000.0)
+    transformer = Transformer.from_crs('EPSG:32632', 'EPSG:4326', always_xy=True)
+    corners = project_bboxes([10, 20, 30, 40], transform, transformer)
+    np.testing.assert_allclose(corners[0], project_corners((10, 20, 30, 40), transform, transformer), rtol=0, atol=1e-9)
@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import subprocess
+import textwrap
+import pytest
+from pyproj import Transformer
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVER_DIR)
+sys.path.append(os.path.join(SERVER_DIR, 'tools'))
+import detect_task
+from benchmark import STUB_MODEL, install_stub_model, make_orthophoto, ORTHO_CRS, ORTHO_ORIGIN, ORTHO_GSD_M
+
+TOKEN = 'JWT test-token'
+
+# Stand-in for WebODM's asset endpoint: serves root with HTTP Range support and logs
+# every request (path, Range, Authorization) as a JSON line to log
+RANGE_SERVER = textwrap.dedent('''
+    import os, sys, json, re
+    from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+    root, log = sys.argv[1], sys.argv[2]
+
+    class Handler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=root, **kwargs)
+
+        def log_message(self, *args):
+            pass
+
+        def record(self, sent):
+            with open(log, 'a') as f:
+                f.write(json.dumps({"path": self.path, "range": self.headers.get('Range'),
+                                    "auth": self.headers.get('Authorization'), "bytes": sent}) + "\\n")
+
+        def do_HEAD(self):
+            self.record(0)
+            super().do_HEAD()
+
+        def do_GET(self):
+            m = re.match(r'bytes=(\\d+)-(\\d*)$', self.headers.get('Range') or '')
+            if not m:
+                self.record(None)
+                return super().do_GET()
+            path = self.translate_path(self.path)
+            size = os.path.getsize(path)
+            start = int(m.group(1))
+            end = min(int(m.group(2)) if m.group(2) else size - 1, size - 1)
+            with open(path, 'rb') as f:
+                f.seek(start)
+                body = f.read(end - start + 1)
+            self.record(len(body))
+            self.send_response(206)
+            self.send_header('Content-Type', 'image/tiff')
+            self.send_header('Accept-Ranges', 'bytes')
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    print(server.server_address[1], flush=True)
+    server.serve_forever()
+''')
+
+@pytest.fixture(scope='module')
+def served(tmp_path_factory):
+    root = tmp_path_factory.mktemp('assets')
+    # One copy per run: GDAL caches /vsicurl/ reads per URL within the process
+    make_orthophoto(str(root / 'ortho.tif'), width=2048, height=2048, nodata=0.2, block=512, seed=5)
+    for name in ('full', 'aoi'):
+        os.makedirs(root / name)
+        os.link(root / 'ortho.tif', root / name / 'ortho.tif')
+
+    script, log = root / 'range_server.py', root / 'requests.log'
+    script.write_text(RANGE_SERVER)
+    proc = subprocess.Popen([sys.executable, str(script), str(root), str(log)], stdout=subprocess.PIPE, text=True)
+    port = int(proc.stdout.readline())
+    install_stub_model()
+    try:
+        yield str(root), f"http://127.0.0.1:{port}", str(log)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def requests_for(log, name):
+    with open(log) as f:
+        return [r for r in map(json.loads, f) if r['path'].startswith(f'/{name}/')]
+
+def run(path, **opts):
+    records = list(detect_task.iter_inference(path, STUB_MODEL, tile_size=512, overlap=0.1, tile_cache=False, **opts))
+    features = sorted(
+        (f['properties']['label'], f['properties']['confidence'], tuple(map(tuple, f['geometry']['coordinates'][0])))
+        for f in records if f['type'] == 'Feature'
+    )
+    return features, records[-1]
+
+def test_remote_run_matches_local(served):
+    root, url, log = served
+    local, local_end = run(os.path.join(root, 'ortho.tif'))
+    remote, remote_end = run(f"/vsicurl/{url}/full/ortho.tif", gdal_env=detect_task.remote_gdal_env({'Authorization': TOKEN}))
+
+    assert len(local) > 0
+    assert remote == local
+    assert remote_end['tiles_total'] == local_end['tiles_total']
+
+    sent = requests_for(log, 'full')
+    assert sent and all(r['auth'] == TOKEN for r in sent)
+    assert any(r['range'] for r in sent)
+
+def test_remote_aoi_reads_a_subset(served):
+    root, url, log = served
+    # AOI over the top-left quarter of the raster
+    to_lonlat = Transformer.from_crs(ORTHO_CRS, 'EPSG:4326', always_xy=True)
+    x0, y0 = ORTHO_ORIGIN
+    quarter = 1024 * ORTHO_GSD_M
+    min_lon, min_lat = to_lonlat.transform(x0 + 10 * ORTHO_GSD_M, y0 - quarter)
+    max_lon, max_lat = to_lonlat.transform(x0 + quarter, y0 - 10 * ORTHO_GSD_M)
+
+    _, full_end = run(os.path.join(root, 'ortho.tif'))
+    features, end = run(f"/vsicurl/{url}/aoi/ortho.tif", gdal_env=detect_task.remote_gdal_env({'Authorization': TOKEN}),
+                        aoi=[min_lon, min_lat, max_lon, max_lat])
+
+    assert 0 < end['tiles_total'] < full_end['tiles_total']
+    assert len(features) > 0
+
+    sent = requests_for(log, 'aoi')
+    assert all(r['auth'] == TOKEN for r in sent)
+    assert sum(r['bytes'] or 0 for r in sent) < os.path.getsize(os.path.join(root, 'ortho.tif'))
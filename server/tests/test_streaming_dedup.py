@@ -0,0 +1,41 @@
+import os
+import sys
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVER_DIR)
+sys.path.append(os.path.join(SERVER_DIR, 'tools'))
+import detect_task
+from benchmark import STUB_MODEL, install_stub_model, make_orthophoto
+
+@pytest.fixture(scope='module')
+def ortho(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('ortho') / 'ortho.tif')
+    # Dense objects so plenty of them straddle the tile overlap bands
+    make_orthophoto(path, width=2048, height=1536, nodata=0.2, objects_per_mp=120, block=512, seed=3)
+    install_stub_model()
+    return path
+
+def run(path, **opts):
+    geojson = detect_task.run_inference(path, STUB_MODEL, tile_size=512, overlap=0.25, tile_cache=False, **opts)
+    return sorted(
+        (f['properties']['label'], f['properties']['confidence'], tuple(map(tuple, f['geometry']['coordinates'][0])))
+        for f in geojson['features']
+    )
+
+def global_pass(monkeypatch):
+    # Every candidate goes to the band and nothing is final before the end: one global dedup
+    monkeypatch.setattr(detect_task, 'split_interior', lambda candidates, interior, class_agnostic=False: ([], list(candidates)))
+    monkeypatch.setattr(detect_task, 'split_final',
+                        lambda candidates, next_y, class_agnostic=False: (list(candidates), []) if next_y is None else ([], list(candidates)))
+
+@pytest.mark.parametrize('policy,class_agnostic', [
+    ('hybrid', False), ('nms', False), ('containment', False), ('hybrid', True),
+])
+def test_streaming_dedup_matches_global_pass(ortho, monkeypatch, policy, class_agnostic):
+    streamed = run(ortho, dedup_policy=policy, class_agnostic=class_agnostic)
+    with monkeypatch.context() as m:
+        global_pass(m)
+        expected = run(ortho, dedup_policy=policy, class_agnostic=class_agnostic)
+    assert len(expected) > 100
+    assert streamed == expected
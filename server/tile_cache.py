@@ -0,0 +1,120 @@
+import os
+import sys
+import json
+import hashlib
+import sqlite3
+import threading
+import time
+import numpy as np
+
+# Raw per-tile detections of orthophoto runs, so a rerun of a task with other dedup
+# settings, or over a changed area of interest, only runs the model on tiles it has not
+# seen. A run is identified by the orthophoto and model contents plus the settings that
+# change what the model sees or returns (tile size, overlap, conf), see run_key.
+CACHE_PATH = os.getenv('TILE_CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'tiles.sqlite'))
+
+# Runs kept (least recently used are dropped first)
+CACHE_MAX_RUNS = int(os.getenv('TILE_CACHE_MAX_RUNS', '50'))
+
+_conn = None
+_lock = threading.Lock()
+
+def _connect():
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute('PRAGMA journal_mode=WAL')
+        _conn.execute('PRAGMA synchronous=NORMAL')
+        # Content hashes of orthophotos / weights, reused while size and mtime are unchanged
+        _conn.execute('CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha1 TEXT)')
+        _conn.execute('CREATE TABLE IF NOT EXISTS runs (run TEXT PRIMARY KEY, used REAL)')
+        _conn.execute('CREATE TABLE IF NOT EXISTS tiles (run TEXT, x INTEGER, y INTEGER, data BLOB, PRIMARY KEY (run, x, y))')
+    return _conn
+
+def file_hash(path, chunk_size=4 * 1024 * 1024):
+    """
+    SHA-1 of the file at path, computed once per file version (size + mtime).
+    None if path is not a local file (e.g. a /vsicurl/ URL).
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    path = os.path.abspath(path)
+    with _lock:
+        row = _connect().execute(
+            'SELECT sha1 FROM files WHERE path = ? AND size = ? AND mtime_ns = ?', (path, st.st_size, st.st_mtime_ns)
+        ).fetchone()
+    if row is not None:
+        return row[0]
+
+    print(f"[TILES] Hashing {path}", file=sys.stderr)
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    sha1 = digest.hexdigest()
+    with _lock:
+        conn = _connect()
+        conn.execute('INSERT OR REPLACE INTO files (path, size, mtime_ns, sha1) VALUES (?, ?, ?, ?)',
+                     (path, st.st_size, st.st_mtime_ns, sha1))
+        conn.commit()
+    return sha1
+
+def run_key(tif_path, model_path, tile_size, overlap, conf):
+    """
+    Cache key of a full resolution inference run, None when the orthophoto can't be
+    hashed (remote) or the cache is unavailable. Models without a local file (names
+    ultralytics resolves itself) are keyed by name.
+    """
+    try:
+        ortho = file_hash(tif_path)
+        if ortho is None:
+            return None
+        model = file_hash(model_path) or os.path.basename(model_path)
+    except (OSError, sqlite3.Error) as e:
+        print(f"[TILES] Cache unavailable: {e}", file=sys.stderr)
+        return None
+    return hashlib.sha1(json.dumps([ortho, model, tile_size, overlap, conf]).encode('utf-8')).hexdigest()
+
+def load_tiles(run):
+    """
+    {(x, y): detections} of the tiles cached for run, detections being (N, 6) arrays of
+    tile-local x1, y1, x2, y2, class, confidence.
+    """
+    try:
+        with _lock:
+            conn = _connect()
+            rows = conn.execute('SELECT x, y, data FROM tiles WHERE run = ?', (run,)).fetchall()
+            conn.execute('UPDATE runs SET used = ? WHERE run = ?', (time.time(), run))
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"[TILES] Cache unavailable: {e}", file=sys.stderr)
+        return {}
+    return {(x, y): np.frombuffer(data, dtype=np.float64).reshape(-1, 6) for x, y, data in rows}
+
+def store_tiles(run, tiles):
+    """
+    Adds [(x, y, detections)] to run (see load_tiles), dropping the least recently used
+    runs beyond CACHE_MAX_RUNS when run is new.
+    """
+    try:
+        with _lock:
+            conn = _connect()
+            new = conn.execute('SELECT 1 FROM runs WHERE run = ?', (run,)).fetchone() is None
+            conn.execute('INSERT OR REPLACE INTO runs (run, used) VALUES (?, ?)', (run, time.time()))
+            conn.executemany(
+                'INSERT OR REPLACE INTO tiles (run, x, y, data) VALUES (?, ?, ?, ?)',
+                [(run, x, y, np.ascontiguousarray(dets, dtype=np.float64).tobytes()) for x, y, dets in tiles]
+            )
+            if new:
+                stale = [r for (r,) in conn.execute(
+                    'SELECT run FROM runs ORDER BY used DESC LIMIT -1 OFFSET ?', (max(1, CACHE_MAX_RUNS),)
+                )]
+                for r in stale:
+                    conn.execute('DELETE FROM tiles WHERE run = ?', (r,))
+                    conn.execute('DELETE FROM runs WHERE run = ?', (r,))
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"[TILES] Cache write failed: {e}", file=sys.stderr)
@@ -0,0 +1,70 @@
+import numpy as np
+from rasterio.windows import Window
+
+# Tiling shared by the orthophoto (detect_task) and raw frame (detect_raw) paths.
+# overlap is the fraction of a tile shared with its neighbour.
+
+def tile_starts(size, tile_size=1280, overlap=0):
+    """
+    Tile start offsets along one axis. The last tile is shifted inward so it
+    stays full size (no sliver tiles) unless the axis is shorter than a tile.
+    """
+    if size <= tile_size:
+        return [0]
+    step = max(1, int(tile_size * (1 - overlap)))
+    starts = list(range(0, size - tile_size + 1, step))
+    if starts[-1] + tile_size < size:
+        starts.append(size - tile_size)
+    return starts
+
+def tile_windows(width, height, tile_size=1280, overlap=0):
+    """
+    Tile windows covering a width x height raster, row by row (top to bottom).
+    """
+    windows = []
+    for y in tile_starts(height, tile_size, overlap):
+        for x in tile_starts(width, tile_size, overlap):
+            w = min(tile_size, width - x)
+            h = min(tile_size, height - y)
+            windows.append(Window(x, y, w, h))
+    return windows
+
+def tile_interiors(windows):
+    """
+    For each window of a tile_windows grid, (x1, y1, x2, y2) of the part that no other
+    window reaches (open bounds, +-inf at the grid border). A detection strictly inside
+    it can't touch detections of any other tile; the rest of the tile is its overlap band.
+    """
+    def bounds(spans):
+        spans = sorted(spans)
+        out = {}
+        for k, (start, size) in enumerate(spans):
+            lo = spans[k - 1][0] + spans[k - 1][1] if k > 0 else -np.inf
+            hi = spans[k + 1][0] if k + 1 < len(spans) else np.inf
+            out[start] = (lo, hi)
+        return out
+
+    cols = bounds({(int(w.col_off), int(w.width)) for w in windows})
+    rows = bounds({(int(w.row_off), int(w.height)) for w in windows})
+    return [(cols[int(w.col_off)][0], rows[int(w.row_off)][0], cols[int(w.col_off)][1], rows[int(w.row_off)][1])
+            for w in windows]
+
+def iter_tile_batches(tiles, batch_size=8, max_batch_pixels=None):
+    """
+    Groups (x, y, img, ...) tiles into lists for a single model.predict call.
+    A batch is closed once it holds batch_size tiles or adding the next tile
+    would exceed max_batch_pixels (H*W summed over the batch).
+    """
+    batch = []
+    batch_pixels = 0
+    for tile in tiles:
+        img = tile[2]
+        tile_pixels = img.shape[0] * img.shape[1]
+        if batch and (len(batch) >= batch_size or (max_batch_pixels and batch_pixels + tile_pixels > max_batch_pixels)):
+            yield batch
+            batch = []
+            batch_pixels = 0
+        batch.append(tile)
+        batch_pixels += tile_pixels
+    if batch:
+        yield batch
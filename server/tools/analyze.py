@@ -3,10 +3,16 @@ import json
 import sys
 import os
 import cv2
-import exifread
+import random
 import statistics
-from ultralytics import YOLO
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# server/tools/analyze.py -> server/ (shared modules)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_cache import get_model
+from image_meta import get_image_meta, image_size
+from detect_raw import iter_frames
 
 # Camera Specifications
 CAMERA_SPECS = {
@@ -16,33 +22,6 @@ CAMERA_SPECS = {
     1920: {'name': 'Arducam 16MP (1080p Crop)', 'sensor_w_mm': 5.21, 'focal_mm': 5.87}
 }
 
-def get_exif_data(image_path):
-    with open(image_path, 'rb') as f:
-        tags = exifread.process_file(f, details=False)
-
-    focal_length = None
-    altitude = None
-
-    if 'EXIF FocalLength' in tags:
-        vals = tags['EXIF FocalLength'].values
-        if vals:
-             val = vals[0] if isinstance(vals, list) else vals
-             if hasattr(val, 'num'): 
-                 focal_length = float(val.num) / float(val.den)
-             elif isinstance(val, (int, float)):
-                 focal_length = float(val)
-
-    if 'GPS GPSAltitude' in tags:
-        vals = tags['GPS GPSAltitude'].values
-        if vals:
-            val = vals[0] if isinstance(vals, list) else vals
-            if hasattr(val, 'num') and hasattr(val, 'den') and val.den != 0:
-                altitude = float(val.num) / float(val.den)
-            elif isinstance(val, (int, float)):
-                 altitude = float(val)
-            
-    return focal_length, altitude
-
 def calculate_gsd(sensor_w_mm, altitude_m, focal_mm, image_w_px):
     if any(param is None for param in [sensor_w_mm, altitude_m, focal_mm, image_w_px]):
         return None
@@ -51,10 +30,213 @@ def calculate_gsd(sensor_w_mm, altitude_m, focal_mm, image_w_px):
     gsd_cm_px = (sensor_w_mm * altitude_m * 100) / (focal_mm * image_w_px)
     return gsd_cm_px
 
+def load_image(img_path):
+    """
+    EXIF metadata + decoded image, or None if unreadable. Runs in the loader pool;
+    the decoded array is what goes to the model, so each file is decoded once.
+    """
+    try:
+        img = cv2.imread(img_path)
+        if img is None:
+            return None
+        return get_image_meta(img_path), img
+    except Exception as e:
+        print(f"Error reading {img_path}: {e}", file=sys.stderr)
+        return None
+
+def camera_for_width(w):
+    """
+    (sensor_w_mm, default_focal_mm, name) of the camera matching image width w.
+    """
+    for expected_w, spec in CAMERA_SPECS.items():
+        if abs(w - expected_w) < 50:
+            return spec['sensor_w_mm'], spec['focal_mm'], spec['name']
+    return 6.3, 5.87, "Unknown Camera"
+
+def image_result(img_name, meta, w, r):
+    focal, alt = meta['focal'], meta['alt']
+    sensor_w, default_focal, cam_name = camera_for_width(w)
+
+    calc_focal = focal if focal else default_focal
+    gsd = calculate_gsd(sensor_w, alt, calc_focal, w)
+
+    boxes = r.boxes
+    det_count = len(boxes)
+    conf_scores = list(boxes.conf.cpu().numpy()) if det_count > 0 else []
+    avg_conf = float(statistics.mean(conf_scores)) if conf_scores else 0.0
+
+    return {
+        "name": img_name,
+        "focal": focal,
+        "alt": alt,
+        "gsd": gsd,
+        "detections": det_count,
+        "avg_conf": avg_conf,
+        "camera": cam_name
+    }
+
+def infer_images(model, paths, batch_size=8, workers=4, read_queue=8):
+    """
+    Result dicts (see image_result) of the readable images in paths. Images are decoded
+    by a pool of workers (at most read_queue ahead of inference) and sent to the model
+    batch_size at a time.
+    """
+    results = []
+    batch = []
+
+    def flush():
+        preds = model.predict([img for _, _, img in batch], verbose=False)
+        for (img_name, meta, img), r in zip(batch, preds):
+            results.append(image_result(img_name, meta, img.shape[1], r))
+        batch.clear()
+
+    for img_path, loaded in iter_frames(paths, workers, read_queue, load=load_image):
+        if loaded is None: continue
+        meta, img = loaded
+        batch.append((os.path.basename(img_path), meta, img))
+        if len(batch) >= max(1, batch_size):
+            flush()
+    if batch:
+        flush()
+    return results
+
+def result_key(x):
+    # Ranking of captures: Detections Desc, then Conf Desc
+    return (x['detections'], x['avg_conf'])
+
+def capture_groups(paths, alt_bucket=5.0, workers=4):
+    """
+    Groups image paths by capture config (camera, altitude bucket, focal), using only
+    the EXIF and the image header (no decoding). Unreadable images are dropped.
+    """
+    def probe(img_path):
+        try:
+            meta = get_image_meta(img_path)
+            size = image_size(img_path, meta)
+        except Exception as e:
+            print(f"Error reading {img_path}: {e}", file=sys.stderr)
+            return None
+        if size is None:
+            return None
+        alt = meta['alt']
+        return camera_for_width(size[0])[2], round(alt / alt_bucket) if alt is not None else None, meta['focal']
+
+    groups = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for img_path, key in zip(paths, pool.map(probe, paths)):
+            if key is not None:
+                groups.setdefault(key, []).append(img_path)
+    return groups
+
+def group_score(results):
+    # Mean detections / confidence of the images run so far in a capture group
+    return (statistics.mean(r['detections'] for r in results), statistics.mean(r['avg_conf'] for r in results))
+
+def sample_images(model, paths, sample=2, alt_bucket=5.0, stable_rounds=2, batch_size=8, workers=4, read_queue=8):
+    """
+    Sampled best-config search: each round runs the model on `sample` more images of
+    every capture group (drawn in a fixed shuffled order, so they spread over the flight)
+    and ranks the groups by their mean score. Stops once the ranking has not changed for
+    stable_rounds rounds, or when the groups are exhausted.
+    Returns (results, top_results, stats), top_results being those of the best group.
+    """
+    groups = capture_groups(paths, alt_bucket, workers)
+    for members in groups.values():
+        random.Random(0).shuffle(members)
+    group_of = {os.path.basename(p): key for key, members in groups.items() for p in members}
+    per_group = {}
+    results = []
+    ranking = None
+    stable = 0
+    rounds = 0
+    step = max(1, sample)
+
+    for start in range(0, max((len(m) for m in groups.values()), default=0), step):
+        picked = [p for members in groups.values() for p in members[start:start + step]]
+        rounds += 1
+        for res in infer_images(model, picked, batch_size, workers, read_queue):
+            results.append(res)
+            per_group.setdefault(group_of[res['name']], []).append(res)
+
+        new_ranking = sorted(per_group, key=lambda k: group_score(per_group[k]), reverse=True)
+        stable = stable + 1 if new_ranking == ranking else 0
+        ranking = new_ranking
+        if stable >= stable_rounds:
+            break
+
+    top = per_group[ranking[0]] if ranking else []
+    return results, top, {
+        "images": len(paths),
+        "groups": len(groups),
+        "inferred": len(results),
+        "rounds": rounds,
+        "stable": stable >= stable_rounds,
+    }
+
+def analyze_dir(image_dir, model_path, batch_size=8, workers=4, read_queue=8, sample=None, alt_bucket=5.0, stable_rounds=2):
+    """
+    Runs the model over the images in image_dir and picks the best performing
+    capture config. Returns the analysis dict (or {"error": ...}).
+    With sample set only a few images per capture group are run and the best image
+    is taken from the best ranked group, see sample_images.
+    """
+    model = get_model(model_path)
+
+    image_files = [f for f in os.listdir(image_dir) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
+    if not image_files:
+        return {"error": "No images found"}
+
+    paths = [os.path.join(image_dir, f) for f in image_files]
+    sampling = None
+    if sample:
+        results, candidates, sampling = sample_images(model, paths, sample, alt_bucket, stable_rounds, batch_size, workers, read_queue)
+    else:
+        results = candidates = infer_images(model, paths, batch_size, workers, read_queue)
+
+    if not results:
+        return {"error": "No results processed"}
+
+    best_result = sorted(candidates, key=result_key, reverse=True)[0]
+
+    display_focal = best_result['focal'] if best_result['focal'] else 7.1 # Fallback from original script?
+
+    recommendations = []
+    if best_result['gsd']:
+         for w_key, spec in CAMERA_SPECS.items():
+            f_mm = spec['focal_mm']
+            s_mm = spec['sensor_w_mm']
+            opt_height = (best_result['gsd'] * f_mm * w_key) / (s_mm * 100)
+            recommendations.append({
+                "camera": spec['name'],
+                "opt_height": round(opt_height, 2)
+            })
+
+    analysis = {
+        "results": results,
+        "best_config": {
+            "image": best_result['name'],
+            "focal_mm": best_result['focal'],
+            "alt_m": best_result['alt'],
+            "gsd": best_result['gsd'],
+            "detections": best_result['detections'],
+            "avg_conf": best_result['avg_conf']
+        },
+        "recommendations": recommendations
+    }
+    if sampling:
+        analysis["sampling"] = sampling
+    return analysis
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--dir', required=True, help='Directory containing images')
     parser.add_argument('--model', required=True, help='Path to YOLO model')
+    parser.add_argument('--batch-size', type=int, default=8, help='Images per inference call')
+    parser.add_argument('--workers', type=int, default=4, help='Image loader threads')
+    parser.add_argument('--read-queue', type=int, default=8, help='Max decoded images waiting for inference')
+    parser.add_argument('--sample', type=int, default=None, help='Sampled search: images per capture group (camera, altitude, focal) per round')
+    parser.add_argument('--alt-bucket', type=float, default=5.0, help='Altitude bucket size in meters for --sample grouping')
+    parser.add_argument('--stable-rounds', type=int, default=2, help='Stop --sample once the group ranking is unchanged for this many rounds')
     args = parser.parse_args()
 
     if not os.path.exists(args.dir):
@@ -62,97 +244,7 @@ def main():
         sys.exit(1)
 
     try:
-        model = YOLO(args.model)
-        
-        image_files = [f for f in os.listdir(args.dir) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-        if not image_files:
-            print(json.dumps({"error": "No images found"}))
-            return
-
-        results = []
-
-        for img_name in image_files:
-            img_path = os.path.join(args.dir, img_name)
-            img = cv2.imread(img_path)
-            if img is None: continue
-            h, w = img.shape[:2]
-            
-            focal, alt = get_exif_data(img_path)
-            
-            cam_spec = None
-            for expected_w, spec in CAMERA_SPECS.items():
-                if abs(w - expected_w) < 50:
-                    cam_spec = spec
-                    break
-            
-            if cam_spec:
-                sensor_w = cam_spec['sensor_w_mm']
-                default_focal = cam_spec['focal_mm']
-                cam_name = cam_spec['name']
-            else:
-                sensor_w = 6.3 
-                default_focal = 5.87
-                cam_name = "Unknown Camera"
-
-            calc_focal = focal if focal else default_focal
-            gsd = calculate_gsd(sensor_w, alt, calc_focal, w)
-            
-            inference_results = model(img_path, verbose=False)
-            
-            det_count = 0
-            conf_scores = []
-            for r in inference_results:
-                boxes = r.boxes
-                det_count += len(boxes)
-                if len(boxes) > 0:
-                    conf_scores.extend(boxes.conf.cpu().numpy())
-            
-            avg_conf = float(statistics.mean(conf_scores)) if conf_scores else 0.0
-            
-            results.append({
-                "name": img_name,
-                "focal": focal,
-                "alt": alt,
-                "gsd": gsd,
-                "detections": det_count,
-                "avg_conf": avg_conf,
-                "camera": cam_name
-            })
-
-        if not results:
-            print(json.dumps({"error": "No results processed"}))
-            return
-
-        # Sort: Detections Desc, then Conf Desc
-        best_result = sorted(results, key=lambda x: (x['detections'], x['avg_conf']), reverse=True)[0]
-        
-        display_focal = best_result['focal'] if best_result['focal'] else 7.1 # Fallback from original script?
-        
-        recommendations = []
-        if best_result['gsd']:
-             for w_key, spec in CAMERA_SPECS.items():
-                f_mm = spec['focal_mm']
-                s_mm = spec['sensor_w_mm']
-                opt_height = (best_result['gsd'] * f_mm * w_key) / (s_mm * 100)
-                recommendations.append({
-                    "camera": spec['name'],
-                    "opt_height": round(opt_height, 2)
-                })
-
-        output = {
-            "results": results,
-            "best_config": {
-                "image": best_result['name'],
-                "focal_mm": best_result['focal'],
-                "alt_m": best_result['alt'],
-                "gsd": best_result['gsd'],
-                "detections": best_result['detections'],
-                "avg_conf": best_result['avg_conf']
-            },
-            "recommendations": recommendations
-        }
-        
-        print(json.dumps(output))
+        print(json.dumps(analyze_dir(args.dir, args.model, args.batch_size, args.workers, args.read_queue, args.sample, args.alt_bucket, args.stable_rounds)))
 
     except Exception as e:
         print(json.dumps({"error": str(e)}))
@@ -0,0 +1,540 @@
+import argparse
+import json
+import sys
+import os
+import time
+import struct
+import platform
+import subprocess
+import tempfile
+import threading
+from contextlib import contextmanager
+import cv2
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.windows import Window
+
+# server/tools/benchmark.py -> server/ (shared modules) and the repo root (localization.py)
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(SERVER_DIR)
+sys.path.append(os.path.dirname(SERVER_DIR))
+import model_cache
+import image_meta
+import dedup
+import localization
+import detect_task
+import detect_raw
+
+# Benchmark of the detection pipeline on synthetic data, no weights or GPU needed:
+#   ortho  - run_inference over a generated GeoTIFF (RGBA, nodata outside the footprint)
+#   raw    - run_detection_raw over generated EXIF-tagged JPEG frames
+#   filter - filter_candidates (hybrid) over clustered candidates
+#   geo    - pixel_to_geo / pixel_to_geo_batch
+# The model is StubModel (deterministic boxes), so "predict" measures the pipeline around
+# the model, not the network. Results are JSON, written with --out and compared with --compare.
+
+STUB_MODEL = 'benchmark-stub.pt'
+
+# Synthetic scenes are placed around here (UTM zone 43N)
+ORIGIN_LAT, ORIGIN_LON = 18.52, 73.85
+ORTHO_CRS = 'EPSG:32643'
+ORTHO_ORIGIN = (375000.0, 2048000.0)
+ORTHO_GSD_M = 0.05
+
+class _Tensor(np.ndarray):
+    # The slice of the torch.Tensor API the pipelines use
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return np.asarray(self)
+
+class _Boxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy.view(_Tensor)
+        self.conf = conf.view(_Tensor)
+        self.cls = cls.view(_Tensor)
+
+    def __len__(self):
+        return len(self.xyxy)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield _Boxes(self.xyxy[i:i + 1], self.conf[i:i + 1], self.cls[i:i + 1])
+
+class _Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+class StubModel:
+    """
+    Deterministic stand-in for a YOLO model: every grid cell (cell px) whose mean red value
+    is above 200 gives a box, plus a slightly larger, lower confidence duplicate around it
+    so dedup has containment / overlap to resolve.
+    """
+    names = {0: 'vehicle', 1: 'structure'}
+
+    def __init__(self, cell=32):
+        self.cell = cell
+
+    def _detect(self, img, conf):
+        c = self.cell
+        h, w = img.shape[0] // c * c, img.shape[1] // c * c
+        means = img[:h, :w, 0].reshape(h // c, c, w // c, c).mean(axis=(1, 3))
+        ys, xs = np.nonzero(means > 200)
+        scores = np.minimum(0.5 + (means[ys, xs] - 200) / 110.0, 0.99)
+
+        x1, y1 = xs * c, ys * c
+        pad = c // 4
+        xyxy = np.concatenate([
+            np.stack([x1, y1, x1 + c, y1 + c], axis=1),
+            np.stack([x1 - pad, y1 - pad, x1 + c + pad, y1 + c + pad], axis=1),
+        ]).astype(np.float32)
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, img.shape[1])
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, img.shape[0])
+        scores = np.concatenate([scores, scores * 0.9]).astype(np.float32)
+        classes = np.tile((xs // 4 + ys // 4) % 2, 2).astype(np.float32)
+
+        keep = scores >= conf
+        return _Result(_Boxes(xyxy[keep], scores[keep], classes[keep]))
+
+    def predict(self, imgs, verbose=False, conf=0.25, **kwargs):
+        if not isinstance(imgs, list):
+            imgs = [imgs]
+        return [self._detect(img, conf) for img in imgs]
+
+    __call__ = predict
+
+def install_stub_model(path=STUB_MODEL):
+    # Seeds the model cache so get_model(path) returns the stub instead of loading weights
+    model = StubModel()
+    with model_cache._lock:
+        model_cache._models[model_cache._model_key(path)] = model
+    return path
+
+class Stages:
+    """
+    Cumulative seconds and call counts per pipeline stage. Stages running in worker
+    threads (reads, crop encoding) are summed over threads, so they can exceed the wall time.
+    """
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def wrap(self, name, fn):
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - t0)
+        return timed
+
+    def wrap_iter(self, name, fn):
+        # Generator functions: time spent producing each item
+        def timed(*args, **kwargs):
+            it = iter(fn(*args, **kwargs))
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    self.add(name, time.perf_counter() - t0)
+                yield item
+        return timed
+
+    def report(self):
+        return {name: {"seconds": round(s, 4), "calls": self.calls[name]} for name, s in sorted(self.seconds.items())}
+
+@contextmanager
+def patched(module, **attrs):
+    saved = {name: getattr(module, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process so far (MB), None where unsupported.
+    Each case runs in its own process (run_isolated), so this is the peak of one case.
+    On Linux VmHWM is used: unlike ru_maxrss it doesn't carry the parent's peak over exec.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def draw_scene(rng, h, w, objects):
+    img = (rng.random((h, w, 3)) * 120).astype(np.uint8)
+    for _ in range(objects):
+        size = int(rng.integers(40, 100))
+        x, y = int(rng.integers(0, max(1, w - size))), int(rng.integers(0, max(1, h - size)))
+        img[y:y + size, x:x + size] = 255
+    return img
+
+def make_orthophoto(path, width=8192, height=8192, nodata=0.3, objects_per_mp=40, block=1024, seed=0):
+    """
+    Writes a tiled RGBA GeoTIFF with overviews, like an ODM orthophoto: noise with bright
+    square objects inside an elliptical footprint, alpha 0 (nodata) outside it.
+    nodata is roughly the fraction of the raster outside the footprint.
+    """
+    rng = np.random.default_rng(seed)
+    transform = rasterio.Affine(ORTHO_GSD_M, 0, ORTHO_ORIGIN[0], 0, -ORTHO_GSD_M, ORTHO_ORIGIN[1])
+    # Ellipse area = pi/4 * scale^2 * W * H
+    scale = min(1.0, np.sqrt(max(0.0, 1.0 - nodata) * 4 / np.pi))
+    profile = {
+        'driver': 'GTiff', 'width': width, 'height': height, 'count': 4, 'dtype': 'uint8',
+        'crs': ORTHO_CRS, 'transform': transform, 'tiled': True, 'blockxsize': 512, 'blockysize': 512,
+        'photometric': 'RGB', 'alpha': 'YES',
+    }
+    with rasterio.open(path, 'w', **profile) as dst:
+        for row in range(0, height, block):
+            for col in range(0, width, block):
+                h, w = min(block, height - row), min(block, width - col)
+                rgb = draw_scene(rng, h, w, int(round(objects_per_mp * h * w / 1e6)))
+                yy, xx = np.mgrid[row:row + h, col:col + w]
+                inside = ((xx - width / 2) / (scale * width / 2)) ** 2 + ((yy - height / 2) / (scale * height / 2)) ** 2 <= 1
+                data = np.dstack([rgb * inside[..., None], inside * 255]).astype(np.uint8)
+                dst.write(np.moveaxis(data, -1, 0), window=Window(col, row, w, h))
+        dst.build_overviews([2, 4, 8, 16], Resampling.average)
+    return path
+
+def _rational(*values):
+    return b''.join(struct.pack('<II', int(round(v * 10000)), 10000) for v in values)
+
+def _dms(value):
+    value = abs(value)
+    d = int(value)
+    m = int((value - d) * 60)
+    return _rational(d, m, (value - d - m / 60) * 3600)
+
+def _ifd(entries, offset):
+    # TIFF IFD at offset: (tag, type, count, payload) entries, payloads over 4 bytes stored after it
+    entries = sorted(entries)
+    data_offset = offset + 2 + 12 * len(entries) + 4
+    head, data = struct.pack('<H', len(entries)), b''
+    for tag, typ, count, payload in entries:
+        if len(payload) <= 4:
+            head += struct.pack('<HHI', tag, typ, count) + payload.ljust(4, b'\0')
+        else:
+            head += struct.pack('<HHII', tag, typ, count, data_offset + len(data))
+            data += payload + b'\0' * (len(payload) % 2)
+    return head + struct.pack('<I', 0) + data
+
+def exif_segment(lat, lon, alt, yaw, focal, width, height):
+    """
+    APP1 segment with the GPS / EXIF tags read by image_meta (little endian TIFF).
+    """
+    def build(exif_offset, gps_offset):
+        ifd0 = _ifd([(0x8769, 4, 1, struct.pack('<I', exif_offset)), (0x8825, 4, 1, struct.pack('<I', gps_offset))], 8)
+        exif = _ifd([(0x920A, 5, 1, _rational(focal)), (0xA002, 4, 1, struct.pack('<I', width)),
+                     (0xA003, 4, 1, struct.pack('<I', height))], exif_offset)
+        gps = _ifd([(1, 2, 2, b'S\0' if lat < 0 else b'N\0'), (2, 5, 3, _dms(lat)),
+                    (3, 2, 2, b'W\0' if lon < 0 else b'E\0'), (4, 5, 3, _dms(lon)),
+                    (6, 5, 1, _rational(alt)), (0x11, 5, 1, _rational(yaw))], gps_offset)
+        return ifd0, exif, gps
+
+    # Offsets depend on the sizes of the IFDs before them: lay out once, then for real
+    ifd0, exif, _ = build(0, 0)
+    ifd0, exif, gps = build(8 + len(ifd0), 8 + len(ifd0) + len(exif))
+    body = b'Exif\0\0' + b'II*\0' + struct.pack('<I', 8) + ifd0 + exif + gps
+    return b'\xff\xe1' + struct.pack('>H', len(body) + 2) + body
+
+def make_frames(frame_dir, count=16, width=4056, height=3040, objects=60, seed=0):
+    """
+    Writes count JPEG frames of a synthetic survey line (GPS, altitude, heading, focal length in EXIF).
+    """
+    os.makedirs(frame_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(count):
+        ok, buf = cv2.imencode('.jpg', draw_scene(rng, height, width, objects))
+        jpeg = buf.tobytes()
+        segment = exif_segment(ORIGIN_LAT + i * 0.0002, ORIGIN_LON + i * 0.0001, 60.0, 15.0 * i, 4.5, width, height)
+        path = os.path.join(frame_dir, f"frame_{i:04d}.jpg")
+        with open(path, 'wb') as f:
+            f.write(jpeg[:2] + segment + jpeg[2:])
+        paths.append(path)
+    return paths
+
+def make_candidates(n=20000, seed=0):
+    """
+    Detection candidates as produced by iter_inference: clusters of overlapping and
+    nested boxes (one object seen by several tiles) spread over a large raster.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.random((max(1, n // 4), 2)) * 50000
+    candidates = []
+    for i in range(n):
+        cx, cy = centers[i % len(centers)] + rng.normal(0, 4, 2)
+        half = rng.uniform(15, 40)
+        cls = int(i % len(centers)) % 3
+        candidates.append({
+            'bbox': [cx - half, cy - half, cx + half, cy + half],
+            'tile_offset': (0, 0),
+            'cls': cls,
+            'label': str(cls),
+            'conf': float(rng.uniform(0.25, 1.0)),
+        })
+    return candidates
+
+def bench_ortho(tif_path, repeat=1, **opts):
+    with rasterio.open(tif_path) as src:
+        megapixels = src.width * src.height / 1e6
+
+    best = None
+    for _ in range(max(1, repeat)):
+        stages = Stages()
+        model = model_cache.get_model(STUB_MODEL)
+        with patched(detect_task,
+                     read_tiles=stages.wrap_iter('read', detect_task.read_tiles),
+                     read_crop=stages.wrap('crop_encode', detect_task.read_crop),
+                     encode_crop=stages.wrap('crop_encode', detect_task.encode_crop),
+                     split_interior=stages.wrap('dedup', detect_task.split_interior),
+                     split_final=stages.wrap('dedup', detect_task.split_final),
+                     filter_candidates=stages.wrap('dedup', detect_task.filter_candidates),
+                     project_bboxes=stages.wrap('projection', detect_task.project_bboxes),
+                     candidate_to_feature=stages.wrap('projection', detect_task.candidate_to_feature)), \
+                patched(model, predict=stages.wrap('predict', model.predict)):
+            t0 = time.perf_counter()
+            # Every run infers all tiles (no tile result cache)
+            geojson = detect_task.run_inference(tif_path, STUB_MODEL, tile_cache=False, **opts)
+            t1 = time.perf_counter()
+            json.dumps(geojson)
+            stages.add('serialize', time.perf_counter() - t1)
+        seconds = time.perf_counter() - t0
+        if best is None or seconds < best['seconds']:
+            best = {
+                "seconds": round(seconds, 4),
+                "megapixels": round(megapixels, 2),
+                "mp_per_s": round(megapixels / seconds, 2),
+                "features": len(geojson['features']),
+                "stages": stages.report(),
+            }
+    best["peak_rss_mb"] = peak_rss_mb()
+    return best
+
+def bench_raw(frame_paths, repeat=1, **opts):
+    megapixels = 0.0
+    for path in frame_paths:
+        w, h = image_meta.image_size(path)
+        megapixels += w * h / 1e6
+
+    best = None
+    for _ in range(max(1, repeat)):
+        stages = Stages()
+        model = model_cache.get_model(STUB_MODEL)
+        with patched(detect_raw,
+                     load_frame=stages.wrap('read', detect_raw.load_frame),
+                     dedup_boxes=stages.wrap('dedup', detect_raw.dedup_boxes),
+                     pixel_to_geo_batch=stages.wrap('projection', detect_raw.pixel_to_geo_batch)), \
+                patched(model, predict=stages.wrap('predict', model.predict)):
+            t0 = time.perf_counter()
+            geojson = detect_raw.run_detection_raw(frame_paths, STUB_MODEL, **opts)
+            t1 = time.perf_counter()
+            json.dumps(geojson)
+            stages.add('serialize', time.perf_counter() - t1)
+        seconds = time.perf_counter() - t0
+        if best is None or seconds < best['seconds']:
+            best = {
+                "seconds": round(seconds, 4),
+                "megapixels": round(megapixels, 2),
+                "mp_per_s": round(megapixels / seconds, 2),
+                "images": len(frame_paths),
+                "features": len(geojson['features']),
+                "stages": stages.report(),
+            }
+    best["peak_rss_mb"] = peak_rss_mb()
+    return best
+
+def bench_filter(n=20000, repeat=1):
+    candidates = make_candidates(n)
+    best = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        survivors = dedup.filter_candidates(list(candidates), 'hybrid')
+        seconds = time.perf_counter() - t0
+        if best is None or seconds < best['seconds']:
+            best = {
+                "seconds": round(seconds, 4),
+                "candidates": n,
+                "survivors": len(survivors),
+                "candidates_per_s": round(n / seconds, 1),
+            }
+    best["peak_rss_mb"] = peak_rss_mb()
+    return best
+
+def bench_geo(points=1_000_000, scalar_points=2000, repeat=1):
+    rng = np.random.default_rng(0)
+    w, h = 4056, 3040
+    px, py = rng.random(points) * w, rng.random(points) * h
+    args = (ORIGIN_LAT, ORIGIN_LON, 60.0)
+    camera = (w, h, 4.5, 6.17, 30.0)
+
+    batch_s = scalar_s = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        localization.pixel_to_geo_batch(*args, px, py, *camera)
+        t1 = time.perf_counter()
+        for i in range(scalar_points):
+            localization.pixel_to_geo(*args, px[i], py[i], *camera)
+        t2 = time.perf_counter()
+        batch_s = t1 - t0 if batch_s is None else min(batch_s, t1 - t0)
+        scalar_s = t2 - t1 if scalar_s is None else min(scalar_s, t2 - t1)
+
+    return {
+        "seconds": round(batch_s + scalar_s, 4),
+        "batch": {"points": points, "seconds": round(batch_s, 4), "points_per_s": round(points / batch_s, 1)},
+        "scalar": {"points": scalar_points, "seconds": round(scalar_s, 4), "points_per_s": round(scalar_points / scalar_s, 1)},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVER_DIR, capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def compare(base, current):
+    """
+    Per case / stage seconds of base vs current report, printed as a table (to stderr).
+    """
+    print(f"{'case':<24}{'base s':>10}{'current s':>12}{'ratio':>8}", file=sys.stderr)
+    for case, res in current['cases'].items():
+        old = base.get('cases', {}).get(case)
+        if old is None:
+            continue
+        rows = [(case, old.get('seconds'), res.get('seconds'))]
+        for stage, s in res.get('stages', {}).items():
+            rows.append((f"  {stage}", old.get('stages', {}).get(stage, {}).get('seconds'), s['seconds']))
+        for name, a, b in rows:
+            ratio = f"{b / a:.2f}" if a and b is not None else '-'
+            print(f"{name:<24}{a if a is not None else '-':>10}{b:>12}{ratio:>8}", file=sys.stderr)
+
+def case_inputs(case, args, workdir):
+    """
+    Synthetic inputs of case in workdir (generated on first use): the orthophoto path
+    for ortho, the frame paths for raw, None for the others.
+    """
+    if case == 'ortho':
+        tif_path = os.path.join(workdir, f"ortho_{args.ortho_size}_{args.nodata}.tif")
+        if not os.path.exists(tif_path):
+            print(f"[BENCH] Generating {tif_path}", file=sys.stderr)
+            make_orthophoto(tif_path, args.ortho_size, args.ortho_size, args.nodata)
+        return tif_path
+    if case == 'raw':
+        frame_dir = os.path.join(workdir, f"frames_{args.frame_width}x{args.frame_height}")
+        frame_paths = [os.path.join(frame_dir, f"frame_{i:04d}.jpg") for i in range(args.frames)]
+        if not all(os.path.exists(p) for p in frame_paths):
+            print(f"[BENCH] Generating {args.frames} frames in {frame_dir}", file=sys.stderr)
+            frame_paths = make_frames(frame_dir, args.frames, args.frame_width, args.frame_height)
+        return frame_paths
+    return None
+
+def run_case(case, args, workdir):
+    # Keep the EXIF cache of the synthetic frames out of the real one
+    image_meta.CACHE_PATH = os.path.join(workdir, 'exif.sqlite')
+    install_stub_model()
+    inputs = case_inputs(case, args, workdir)
+    if case == 'ortho':
+        return bench_ortho(inputs, args.repeat, tile_size=args.tile_size, overlap=args.overlap, batch_size=args.batch_size)
+    if case == 'raw':
+        return bench_raw(inputs, args.repeat, batch_size=args.batch_size)
+    if case == 'filter':
+        return bench_filter(args.candidates, args.repeat)
+    if case == 'geo':
+        return bench_geo(args.points, repeat=args.repeat)
+    raise ValueError(f"Unknown case: {case}")
+
+def run_isolated(case, args):
+    """
+    Runs case in a fresh interpreter, so peak_rss_mb is that case's own peak and not
+    the highest of the cases run before it.
+    """
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', '--cases', case, '--workdir', args.workdir,
+           '--repeat', str(args.repeat), '--ortho-size', str(args.ortho_size), '--nodata', str(args.nodata),
+           '--tile-size', str(args.tile_size), '--overlap', str(args.overlap), '--batch-size', str(args.batch_size),
+           '--frames', str(args.frames), '--frame-width', str(args.frame_width), '--frame-height', str(args.frame_height),
+           '--candidates', str(args.candidates), '--points', str(args.points)]
+    out = subprocess.run(cmd, stdout=subprocess.PIPE, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the detection pipeline on synthetic data (stub model)')
+    parser.add_argument('--cases', default='ortho,raw,filter,geo', help='Comma separated: ortho, raw, filter, geo')
+    parser.add_argument('--workdir', default=None, help='Where synthetic data is generated (reused if present, default: temp dir)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per case, the fastest is reported')
+    parser.add_argument('--ortho-size', type=int, default=8192, help='Width and height of the synthetic orthophoto')
+    parser.add_argument('--nodata', type=float, default=0.3, help='Fraction of the orthophoto outside the footprint')
+    parser.add_argument('--tile-size', type=int, default=1280, help='Orthophoto tile size')
+    parser.add_argument('--overlap', type=float, default=0.1, help='Orthophoto tile overlap (fraction of a tile)')
+    parser.add_argument('--batch-size', type=int, default=8, help='Inputs per model.predict call')
+    parser.add_argument('--frames', type=int, default=16, help='Number of synthetic raw frames')
+    parser.add_argument('--frame-width', type=int, default=4056)
+    parser.add_argument('--frame-height', type=int, default=3040)
+    parser.add_argument('--candidates', type=int, default=20000, help='Candidates for the filter case')
+    parser.add_argument('--points', type=int, default=1_000_000, help='Pixels for the geo case')
+    parser.add_argument('--out', default=None, help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--compare', default=None, help='Earlier JSON report to compare against')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # One case in this process, its result goes to stdout (see run_isolated)
+        print(json.dumps(run_case(args.cases, args, args.workdir)))
+        return
+
+    cases = [c.strip() for c in args.cases.split(',') if c.strip()]
+    workdir = args.workdir or tempfile.mkdtemp(prefix='detect-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    args.workdir = workdir
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k != 'child'},
+        "cases": {},
+    }
+
+    for case in cases:
+        # Inputs are generated here, so the case process only measures the run
+        case_inputs(case, args, workdir)
+        report['cases'][case] = run_isolated(case, args)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()